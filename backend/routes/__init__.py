@@ -3,25 +3,32 @@
 
 __all__ = [
     'auth_router', 'init_auth_routes',
-    'users_router', 'init_users_routes',
-    'tasks_router', 'init_tasks_routes',
+    'users_router', 'init_users_routes', 'ensure_users_indexes',
+    'tasks_router', 'init_tasks_routes', 'ensure_tasks_indexes', 'invalidate_reference_cache',
     'attendance_router', 'init_attendance_routes',
-    'timesheets_router', 'init_timesheets_routes',
-    'tenants_router', 'init_tenants_routes',
-    'projects_router', 'init_projects_routes',
+    'timesheets_router', 'init_timesheets_routes', 'ensure_timesheets_indexes', 'invalidate_timesheet_cache',
+    'tenants_router', 'init_tenants_routes', 'ensure_tenants_indexes',
+    'projects_router', 'init_projects_routes', 'ensure_projects_indexes',
 ]
 
 from .auth import router as auth_router
 from .auth import init_auth_routes
 from .users import router as users_router
 from .users import init_users_routes
+from .users import ensure_users_indexes
 from .tasks import router as tasks_router
 from .tasks import init_tasks_routes
+from .tasks import ensure_tasks_indexes
+from .tasks import invalidate_reference_cache
 from .attendance import router as attendance_router
 from .attendance import init_attendance_routes
 from .timesheets import router as timesheets_router
 from .timesheets import init_timesheets_routes
+from .timesheets import ensure_timesheets_indexes
+from .timesheets import invalidate_timesheet_cache
 from .tenants import router as tenants_router
 from .tenants import init_tenants_routes
+from .tenants import ensure_tenants_indexes
 from .projects import router as projects_router
 from .projects import init_projects_routes
+from .projects import ensure_projects_indexes
@@ -7,16 +7,16 @@ from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel, Field, EmailStr
 from typing import Optional
 from datetime import datetime, timezone, timedelta
+import asyncio
 import uuid
 import jwt
 import random
 import string
-from passlib.context import CryptContext
+from .passwords import pwd_context
 
 router = APIRouter(tags=["Authentication"])
 
 security = HTTPBearer()
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 
 def parse_datetime(date_value):
@@ -125,6 +125,11 @@ def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
 
 
+def verify_and_update_password(plain_password, hashed_password):
+    """Verify a password; also returns a fresh argon2 hash when the stored one is deprecated"""
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
 def get_password_hash(password):
     return pwd_context.hash(password)
 
@@ -198,11 +203,22 @@ async def login(login_data: LoginRequest):
         "active": True
     })
     
-    if not user or not verify_password(login_data.password, user.get("password_hash", "")):
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Incorrect email or password"
+        )
+    
+    verified, new_hash = await asyncio.to_thread(
+        verify_and_update_password, login_data.password, user.get("password_hash", "")
+    )
+    if not verified:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password"
         )
+    if new_hash:
+        await db.users.update_one({"id": user["id"]}, {"$set": {"password_hash": new_hash}})
     
     # Check if this is a super_admin login
     is_super_admin = user.get("role") == "super_admin" or tenant.get("is_admin_tenant")
@@ -239,9 +255,8 @@ async def login(login_data: LoginRequest):
 @router.get("/auth/me")
 async def get_current_user_info(current_user = Depends(get_current_user)):
     # Get tenant info for the user
-    user_doc = await db.users.find_one({"id": current_user.id})
-    tenant_id = user_doc.get("tenant_id") if user_doc else None
-    is_super_admin = user_doc.get("role") == "super_admin" if user_doc else False
+    tenant_id = current_user.tenant_id
+    is_super_admin = current_user.role == UserRole.SUPER_ADMIN
     
     tenant_info = None
     if tenant_id:
@@ -433,7 +448,7 @@ async def reset_password_with_otp(request: ResetPasswordWithOTPRequest):
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    new_password_hash = get_password_hash(request.new_password)
+    new_password_hash = await asyncio.to_thread(get_password_hash, request.new_password)
     
     await db.users.update_one(
         {"email": request.email},
@@ -464,10 +479,13 @@ async def change_own_password(
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    if not verify_password(password_data.current_password, user.get("password_hash", "")):
+    current_ok = await asyncio.to_thread(
+        verify_password, password_data.current_password, user.get("password_hash", "")
+    )
+    if not current_ok:
         raise HTTPException(status_code=400, detail="Current password is incorrect")
     
-    new_password_hash = get_password_hash(password_data.new_password)
+    new_password_hash = await asyncio.to_thread(get_password_hash, password_data.new_password)
     
     await db.users.update_one(
         {"id": current_user.id},
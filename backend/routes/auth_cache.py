@@ -0,0 +1,39 @@
+"""
+Resolved-caller cache for TaskAct
+One short-lived cache shared by the route modules' auth dependencies
+"""
+import hashlib
+import time
+from cachetools import TTLCache
+
+# Resolved callers keyed by (scope, SHA-256 of the bearer token) - never the raw token.
+# The scope keeps each module's own caller type apart. Entries live at most 5s, are
+# never served past the token's own expiry, and user writes clear them outright.
+_auth_cache = TTLCache(maxsize=10_000, ttl=5)
+
+
+def _cache_key(scope, token):
+    return scope, hashlib.sha256(token.encode()).digest()
+
+
+def get_cached_caller(scope, token):
+    """Return the caller cached for this token, or None on a miss or once the token has expired"""
+    cache_key = _cache_key(scope, token)
+    cached = _auth_cache.get(cache_key)
+    if cached is None:
+        return None
+    caller, exp = cached
+    if exp is not None and time.time() >= exp:
+        _auth_cache.pop(cache_key, None)
+        return None
+    return caller
+
+
+def cache_caller(scope, token, caller, exp):
+    """Cache a successfully verified caller until the TTL or the token's exp, whichever is first"""
+    _auth_cache[_cache_key(scope, token)] = (caller, exp)
+
+
+def clear_auth_cache():
+    """Drop every cached caller (called when a user is edited, deactivated or deleted)"""
+    _auth_cache.clear()
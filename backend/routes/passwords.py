@@ -0,0 +1,15 @@
+"""
+Password hashing for TaskAct
+One context shared by every module that hashes or verifies passwords
+"""
+from passlib.context import CryptContext
+
+# New hashes use argon2. Legacy bcrypt hashes still verify; the user and super-admin
+# logins rehash them to argon2 through verify_and_update.
+pwd_context = CryptContext(
+    schemes=["argon2", "bcrypt"],
+    deprecated=["bcrypt"],
+    argon2__time_cost=2,
+    argon2__memory_cost=65536,
+    argon2__parallelism=1
+)
@@ -10,14 +10,22 @@ Key concepts:
 """
 from fastapi import APIRouter, HTTPException, Depends, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel, Field
 from typing import Optional, List
 from datetime import datetime, timezone, timedelta
 from enum import Enum
+from cachetools import TTLCache
+import asyncio
+from pymongo import ReturnDocument
+from bson import ObjectId
+from bson.errors import InvalidId
 import uuid
 import jwt
+from .auth_cache import get_cached_caller, cache_caller
 
-router = APIRouter(tags=["Projects"])
+# Project lists carry nested tasks; orjson serializes them several times faster than json
+router = APIRouter(tags=["Projects"], default_response_class=ORJSONResponse)
 
 security = HTTPBearer()
 
@@ -30,16 +38,37 @@ UserResponse = None
 TaskStatus = None
 parse_from_mongo = None
 prepare_for_mongo = None
+invalidate_timesheet_cache = None
 logger = None
 
+# Per-tenant cache of the template list shown in the "new project" flow.
+# Templates change rarely, so entries live for a minute and are dropped on writes.
+_template_cache = TTLCache(maxsize=1000, ttl=60)
+
+# Fields returned by the list endpoints; everything else stays on the server
+PROJECT_LIST_PROJECTION = {
+    "_id": 0, "id": 1, "name": 1, "description": 1, "client_id": 1, "client_name": 1,
+    "category": 1, "due_date": 1, "status": 1, "created_at": 1, "created_by": 1,
+    "created_by_name": 1, "tenant_id": 1
+}
+PROJECT_TASK_PROJECTION = {
+    "_id": 0, "id": 1, "title": 1, "description": 1, "status": 1, "priority": 1,
+    "category": 1, "client_name": 1, "due_date": 1, "assignee_id": 1, "assignee_name": 1,
+    "project_id": 1, "created_at": 1, "completed_at": 1
+}
+# Only the fields the resolved auth user is built from
+AUTH_USER_PROJECTION = {
+    "_id": 0, "id": 1, "name": 1, "email": 1, "role": 1, "tenant_id": 1, "managed_members": 1
+}
+
 
 def init_projects_routes(
     _db, _secret_key, _algorithm, _user_role, _user_response,
-    _task_status, _parse_mongo, _prepare_mongo, _logger
+    _task_status, _parse_mongo, _prepare_mongo, _invalidate_timesheet_cache, _logger
 ):
     """Initialize projects routes with dependencies from main app"""
     global db, SECRET_KEY, ALGORITHM, UserRole, UserResponse
-    global TaskStatus, parse_from_mongo, prepare_for_mongo, logger
+    global TaskStatus, parse_from_mongo, prepare_for_mongo, invalidate_timesheet_cache, logger
     
     db = _db
     SECRET_KEY = _secret_key
@@ -49,9 +78,21 @@ def init_projects_routes(
     TaskStatus = _task_status
     parse_from_mongo = _parse_mongo
     prepare_for_mongo = _prepare_mongo
+    invalidate_timesheet_cache = _invalidate_timesheet_cache
     logger = _logger
 
 
+async def ensure_projects_indexes():
+    """Create the indexes behind the hot project queries (idempotent, run at startup)"""
+    await db.tasks.create_index([("tenant_id", 1), ("project_id", 1), ("status", 1)])
+    await db.tasks.create_index([("project_id", 1), ("created_at", 1), ("_id", 1)])
+    await db.projects.create_index([("tenant_id", 1), ("created_at", -1)])
+    await db.projects.create_index([("id", 1)], unique=True)
+    await db.project_templates.create_index([("tenant_id", 1), ("name", 1)])
+    await db.project_templates.create_index([("scope", 1), ("tenant_id", 1)])
+    await db.users.create_index([("id", 1), ("active", 1)])
+
+
 # ==================== ENUMS ====================
 
 class ProjectStatus(str, Enum):
@@ -147,8 +188,20 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
         headers={"WWW-Authenticate": "Bearer"},
     )
     
+    cached_user = get_cached_caller("projects", credentials.credentials)
+    if cached_user is not None:
+        return dict(cached_user)
+    
+    # Only successful verifications reach the cache
+    user, exp = await _resolve_current_user(credentials.credentials, credentials_exception)
+    cache_caller("projects", credentials.credentials, user, exp)
+    return dict(user)
+
+
+async def _resolve_current_user(token, credentials_exception):
+    """Verify the token and load the user it belongs to. Returns (user, exp)."""
     try:
-        payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         user_id: str = payload.get("sub")
         tenant_id: str = payload.get("tenant_id")
         is_super_admin: bool = payload.get("is_super_admin", False)
@@ -160,9 +213,9 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
     
     # For super admin, return a special user object
     if is_super_admin:
-        admin = await db.super_admins.find_one({"id": user_id})
+        admin = await db.super_admins.find_one({"id": user_id}, AUTH_USER_PROJECTION)
         if not admin:
-            admin = await db.users.find_one({"id": user_id, "role": "super_admin"})
+            admin = await db.users.find_one({"id": user_id, "role": "super_admin"}, AUTH_USER_PROJECTION)
         if admin:
             return {
                 "id": admin["id"],
@@ -171,9 +224,9 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
                 "role": "super_admin",
                 "tenant_id": None,
                 "is_super_admin": True
-            }
+            }, payload.get("exp")
     
-    user = await db.users.find_one({"id": user_id, "active": True})
+    user = await db.users.find_one({"id": user_id, "active": True}, AUTH_USER_PROJECTION)
     if user is None:
         raise credentials_exception
     
@@ -183,8 +236,17 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
         "email": user["email"],
         "role": user["role"],
         "tenant_id": user.get("tenant_id") or tenant_id,
-        "is_super_admin": False
-    }
+        "is_super_admin": False,
+        # Carried on the resolved user so handlers don't re-read the users collection
+        "managed_members": user.get("managed_members") or []
+    }, payload.get("exp")
+
+
+async def _maybe(awaitable):
+    """Await awaitable if one is given, else return None (lets asyncio.gather skip optional lookups)"""
+    if awaitable is None:
+        return None
+    return await awaitable
 
 
 async def get_current_partner(current_user = Depends(get_current_user)):
@@ -202,19 +264,35 @@ async def get_current_partner(current_user = Depends(get_current_user)):
 @router.get("/project-templates")
 async def get_project_templates(current_user = Depends(get_current_user)):
     """Get all templates available to the user (global + tenant-specific)"""
-    query = {"$or": [{"scope": "global"}]}
+    tenant_id = current_user.get("tenant_id")
+    if tenant_id:
+        query = {"$or": [{"scope": "global"}, {"tenant_id": tenant_id}]}
+    else:
+        # A single-clause $or would still be planned as an $or; use the plain equality
+        query = {"scope": "global"}
     
-    if current_user.get("tenant_id"):
-        query["$or"].append({"tenant_id": current_user["tenant_id"]})
+    templates = _template_cache.get(tenant_id)
+    if templates is None:
+        # Task blueprints are kept: the new-project flow instantiates them from this list
+        cursor = db.project_templates.find(query, {"_id": 0}).sort("name", 1).limit(500)
+        templates = [t async for t in cursor]
+        _template_cache[tenant_id] = templates
     
-    templates = await db.project_templates.find(query).sort("name", 1).to_list(length=500)
+    # Resolve the caller's permissions once for the whole list (same rules as can_edit_template)
+    is_super = current_user.get("is_super_admin", False)
+    is_partner_role = current_user["role"] == "partner"
     
     result = []
     for template in templates:
-        t = parse_from_mongo(template)
+        t = dict(template)
         # Add permission info
-        t["can_edit"] = can_edit_template(template, current_user)
-        t["can_delete"] = can_delete_template(template, current_user)
+        can_edit = is_super or (
+            is_partner_role
+            and template.get("scope") != "global"
+            and template.get("tenant_id") == tenant_id
+        )
+        t["can_edit"] = can_edit
+        t["can_delete"] = can_edit
         result.append(t)
     
     return result
@@ -242,6 +320,15 @@ def can_delete_template(template, current_user):
     return can_edit_template(template, current_user)
 
 
+def invalidate_template_cache(template):
+    """Drop cached template lists that may contain the given template"""
+    if template.get("scope") == "global":
+        # Global templates are visible to every tenant
+        _template_cache.clear()
+    else:
+        _template_cache.pop(template.get("tenant_id"), None)
+
+
 @router.post("/project-templates")
 async def create_project_template(
     template_data: ProjectTemplateCreate,
@@ -257,7 +344,7 @@ async def create_project_template(
         "client_id": template_data.client_id,
         "category": template_data.category,
         "default_assignee_id": template_data.default_assignee_id,
-        "tasks": [t.dict() for t in template_data.tasks],
+        "tasks": [t.model_dump() for t in template_data.tasks],
         "scope": "global" if is_super_admin else "tenant",
         "tenant_id": None if is_super_admin else current_user.get("tenant_id"),
         "created_by": current_user["id"],
@@ -268,6 +355,7 @@ async def create_project_template(
     
     template_dict = prepare_for_mongo(template_dict)
     await db.project_templates.insert_one(template_dict)
+    invalidate_template_cache(template_dict)
     
     logger.info(f"Template created: {template_data.name} by {current_user['name']}")
     
@@ -291,23 +379,26 @@ async def update_project_template(
             detail="You don't have permission to edit this template"
         )
     
-    update_data = {k: v for k, v in template_update.dict().items() if v is not None}
+    update_fields = template_update.model_dump()
+    update_data = {k: v for k, v in update_fields.items() if v is not None}
     
     # Handle default_assignee_id specially - allow setting to null to clear it
     if template_update.default_assignee_id is not None:
         update_data["default_assignee_id"] = template_update.default_assignee_id
-    elif "default_assignee_id" in template_update.dict(exclude_unset=False):
+    elif "default_assignee_id" in update_fields:
         # If explicitly passed as null, set it to null
         update_data["default_assignee_id"] = None
     
-    if "tasks" in update_data:
-        update_data["tasks"] = [t if isinstance(t, dict) else t.dict() for t in update_data["tasks"]]
-    
+    updated = template
     if update_data:
         update_data["updated_at"] = datetime.now(timezone.utc).isoformat()
-        await db.project_templates.update_one({"id": template_id}, {"$set": update_data})
+        updated = await db.project_templates.find_one_and_update(
+            {"id": template_id},
+            {"$set": update_data},
+            return_document=ReturnDocument.AFTER
+        )
+        invalidate_template_cache(template)
     
-    updated = await db.project_templates.find_one({"id": template_id})
     return parse_from_mongo(updated)
 
 
@@ -328,6 +419,7 @@ async def delete_project_template(
         )
     
     await db.project_templates.delete_one({"id": template_id})
+    invalidate_template_cache(template)
     
     logger.info(f"Template deleted: {template['name']} by {current_user['name']}")
     
@@ -350,9 +442,7 @@ async def get_projects(current_user = Depends(get_current_user)):
     viewable_project_ids = None
     if not is_partner:
         if is_ad:
-            user_doc = await db.users.find_one({"id": current_user["id"]})
-            managed_ids = user_doc.get("managed_members", []) if user_doc else []
-            viewable_ids = [current_user["id"]] + managed_ids
+            viewable_ids = [current_user["id"]] + current_user.get("managed_members", [])
         else:
             viewable_ids = [current_user["id"]]
         
@@ -363,44 +453,66 @@ async def get_projects(current_user = Depends(get_current_user)):
         project_ids = await db.tasks.distinct("project_id", task_query)
         viewable_project_ids = set(project_ids)
     
-    projects = await db.projects.find(query).sort("created_at", -1).to_list(length=500)
-    
-    result = []
-    for project in projects:
-        # Filter: non-partners only see projects with their tasks
-        if viewable_project_ids is not None and project["id"] not in viewable_project_ids:
-            continue
-        
-        p = parse_from_mongo(project)
-        
-        # Get task counts for this project
-        task_query = {"project_id": project["id"]}
+    # Stream the newest 500 projects. Dates stay as the stored ISO strings: parsing
+    # them only for the JSON response to format them straight back is wasted work
+    # Filter: non-partners only see projects with their tasks
+    projects = []
+    cursor = db.projects.find(query, PROJECT_LIST_PROJECTION).sort("created_at", -1).limit(500)
+    async for project in cursor:
+        if viewable_project_ids is None or project["id"] in viewable_project_ids:
+            projects.append(project)
+    
+    # Get task counts for all listed projects in one aggregation
+    counts_by_pid = {}
+    if projects:
+        count_match = {"project_id": {"$in": [p["id"] for p in projects]}}
         if current_user.get("tenant_id"):
-            task_query["tenant_id"] = current_user["tenant_id"]
+            count_match["tenant_id"] = current_user["tenant_id"]
         
-        total_tasks = await db.tasks.count_documents(task_query)
-        completed_tasks = await db.tasks.count_documents({**task_query, "status": "completed"})
-        
-        p["total_tasks"] = total_tasks
-        p["completed_tasks"] = completed_tasks
-        p["progress"] = (completed_tasks / total_tasks * 100) if total_tasks > 0 else 0
-        
-        # Auto-compute status based on task completion (unless on_hold)
-        stored_status = project.get("status", "active")
-        if stored_status != "on_hold":
-            if total_tasks == 0:
-                p["status"] = "pending"
-            elif completed_tasks == total_tasks:
-                p["status"] = "completed"
-            else:
-                p["status"] = "pending"
+        pipeline = [
+            {"$match": count_match},
+            {"$group": {
+                "_id": "$project_id",
+                "total": {"$sum": 1},
+                "completed": {"$sum": {"$cond": [{"$eq": ["$status", "completed"]}, 1, 0]}}
+            }}
+        ]
+        async for row in db.tasks.aggregate(pipeline):
+            counts_by_pid[row["_id"]] = row
+    
+    # Resolve the caller's permissions once for the whole list (same rules as can_edit_project)
+    is_super = current_user.get("is_super_admin", False)
+    is_partner_role = current_user["role"] == "partner"
+    user_tenant = current_user.get("tenant_id")
+    user_id = current_user["id"]
+    
+    for p in projects:
+        counts = counts_by_pid.get(p["id"], {})
+        apply_task_progress(p, counts.get("total", 0), counts.get("completed", 0))
         
         # Add permission info
-        p["can_edit"] = can_edit_project(project, current_user)
-        
-        result.append(p)
+        if is_super:
+            p["can_edit"] = True
+        elif is_partner_role:
+            p["can_edit"] = p.get("tenant_id") == user_tenant
+        else:
+            p["can_edit"] = p.get("created_by") == user_id
     
-    return result
+    return projects
+
+
+def apply_task_progress(project, total_tasks, completed_tasks):
+    """Attach task counts and progress, and auto-compute status (unless on_hold)"""
+    project["total_tasks"] = total_tasks
+    project["completed_tasks"] = completed_tasks
+    project["progress"] = (completed_tasks / total_tasks * 100) if total_tasks > 0 else 0
+    
+    if project.get("status", "active") != "on_hold":
+        if total_tasks > 0 and completed_tasks == total_tasks:
+            project["status"] = "completed"
+        else:
+            project["status"] = "pending"
+    return project
 
 
 def can_edit_project(project, current_user):
@@ -430,14 +542,31 @@ async def create_project(
     
     Optionally save as template for future use.
     """
+    return await _create_project_impl(project_data, current_user)
+
+
+async def _create_project_impl(project_data: ProjectCreate, current_user, template=None):
+    """Create the project and its tasks; `template` may be passed in when already fetched"""
     tenant_id = current_user.get("tenant_id")
+    # One creation timestamp for the project and any saved template; tasks step from it
+    now = datetime.now(timezone.utc)
+    now_iso = now.isoformat()
     
-    # Get client name if client_id provided
+    # Get client name (if client_id provided) and template concurrently
     client_name = project_data.client_name
-    if project_data.client_id and not client_name:
-        client = await db.clients.find_one({"id": project_data.client_id})
-        if client:
-            client_name = client["name"]
+    client, fetched_template = await asyncio.gather(
+        _maybe(
+            db.clients.find_one({"id": project_data.client_id}, {"_id": 0, "name": 1})
+            if project_data.client_id and not client_name else None
+        ),
+        _maybe(
+            db.project_templates.find_one({"id": project_data.template_id})
+            if project_data.template_id and template is None else None
+        )
+    )
+    template = template or fetched_template
+    if client:
+        client_name = client["name"]
     
     # Create the project record
     project_id = str(uuid.uuid4())
@@ -453,7 +582,7 @@ async def create_project(
         "tenant_id": tenant_id,
         "created_by": current_user["id"],
         "created_by_name": current_user["name"],
-        "created_at": datetime.now(timezone.utc).isoformat(),
+        "created_at": now_iso,
         "from_template_id": project_data.template_id
     }
     
@@ -462,7 +591,6 @@ async def create_project(
     
     if project_data.template_id:
         # Create from template
-        template = await db.project_templates.find_one({"id": project_data.template_id})
         if not template:
             raise HTTPException(status_code=404, detail="Template not found")
         
@@ -503,15 +631,20 @@ async def create_project(
                 "due_date": task.due_date or project_data.due_date
             })
     
-    # Create actual tasks in the tasks collection
+    # Look up all assignee names in one query
+    assignee_ids = list({td["assignee_id"] for td in task_definitions if td.get("assignee_id")})
+    name_map = {}
+    if assignee_ids:
+        assignees = await db.users.find(
+            {"id": {"$in": assignee_ids}},
+            {"_id": 0, "id": 1, "name": 1}
+        ).to_list(length=len(assignee_ids))
+        name_map = {u["id"]: u["name"] for u in assignees}
+    
+    # Build actual tasks for the tasks collection
     created_tasks = []
-    for task_def in task_definitions:
-        # Get assignee name
-        assignee_name = None
-        if task_def.get("assignee_id"):
-            assignee = await db.users.find_one({"id": task_def["assignee_id"]})
-            if assignee:
-                assignee_name = assignee["name"]
+    for i, task_def in enumerate(task_definitions):
+        assignee_name = name_map.get(task_def.get("assignee_id"))
         
         task_dict = {
             "id": str(uuid.uuid4()),
@@ -530,18 +663,20 @@ async def create_project(
             "tenant_id": tenant_id,
             "created_by": current_user["id"],
             "creator_name": current_user["name"],
-            "created_at": datetime.now(timezone.utc).isoformat()
+            # Distinct, ascending per task: task lists sort on created_at alone
+            "created_at": (now + timedelta(microseconds=i)).isoformat()
         }
         
-        task_dict = prepare_for_mongo(task_dict)
-        await db.tasks.insert_one(task_dict)
-        created_tasks.append(task_dict)
+        created_tasks.append(prepare_for_mongo(task_dict))
     
-    # Save project
+    # Tasks, project and optional template are independent writes
     project_dict = prepare_for_mongo(project_dict)
-    await db.projects.insert_one(project_dict)
+    writes = [db.projects.insert_one(project_dict)]
+    if created_tasks:
+        writes.append(db.tasks.insert_many(created_tasks, ordered=False))
     
     # Optionally save as template
+    template_dict = None
     if project_data.save_as_template:
         template_name = project_data.template_name or f"Template: {project_data.name}"
         template_dict = {
@@ -564,11 +699,15 @@ async def create_project(
             "tenant_id": tenant_id,
             "created_by": current_user["id"],
             "created_by_name": current_user["name"],
-            "created_at": datetime.now(timezone.utc).isoformat(),
+            "created_at": now_iso,
             "is_super_admin_created": False
         }
         template_dict = prepare_for_mongo(template_dict)
-        await db.project_templates.insert_one(template_dict)
+        writes.append(db.project_templates.insert_one(template_dict))
+    
+    await asyncio.gather(*writes)
+    if template_dict:
+        invalidate_template_cache(template_dict)
     
     logger.info(f"Project created: {project_data.name} with {len(created_tasks)} tasks by {current_user['name']}")
     
@@ -588,33 +727,42 @@ async def get_project(project_id: str, current_user = Depends(get_current_user))
     if current_user.get("tenant_id"):
         query["tenant_id"] = current_user["tenant_id"]
     
-    project = await db.projects.find_one(query)
-    if not project:
+    # Fetch the project and all its tasks in one round-trip
+    task_match = {"$expr": {"$eq": ["$project_id", "$$pid"]}}
+    if current_user.get("tenant_id"):
+        task_match["tenant_id"] = current_user["tenant_id"]
+    
+    pipeline = [
+        {"$match": query},
+        {"$limit": 1},
+        {"$lookup": {
+            "from": "tasks",
+            "let": {"pid": "$id"},
+            "pipeline": [
+                {"$match": task_match},
+                # Tasks created together share created_at; _id keeps their insertion order
+                {"$sort": {"created_at": 1, "_id": 1}},
+                {"$limit": 500},
+                {"$project": {"_id": 0}}
+            ],
+            "as": "tasks"
+        }},
+        {"$project": {"_id": 0}}
+    ]
+    docs = await db.projects.aggregate(pipeline).to_list(length=1)
+    if not docs:
         raise HTTPException(status_code=404, detail="Project not found")
     
-    # Get all tasks for this project
-    task_query = {"project_id": project_id}
-    if current_user.get("tenant_id"):
-        task_query["tenant_id"] = current_user["tenant_id"]
+    project = docs[0]
+    tasks = project.pop("tasks")
     
-    tasks = await db.tasks.find(task_query).sort("created_at", 1).to_list(length=500)
+    # Counts come from the tasks already fetched - no extra count queries
+    completed_tasks = sum(1 for t in tasks if t.get("status") == "completed")
     
-    result = parse_from_mongo(project)
-    result["tasks"] = [parse_from_mongo(t) for t in tasks]
-    result["total_tasks"] = len(tasks)
-    result["completed_tasks"] = len([t for t in tasks if t.get("status") == "completed"])
-    result["progress"] = (result["completed_tasks"] / result["total_tasks"] * 100) if result["total_tasks"] > 0 else 0
+    result = project
+    result["tasks"] = tasks
     result["can_edit"] = can_edit_project(project, current_user)
-    
-    # Auto-compute status based on task completion (unless on_hold)
-    stored_status = project.get("status", "active")
-    if stored_status != "on_hold":
-        if result["total_tasks"] == 0:
-            result["status"] = "pending"
-        elif result["completed_tasks"] == result["total_tasks"]:
-            result["status"] = "completed"
-        else:
-            result["status"] = "pending"
+    apply_task_progress(result, len(tasks), completed_tasks)
     
     return result
 
@@ -640,22 +788,27 @@ async def update_project(
             detail="You don't have permission to edit this project"
         )
     
-    update_data = {k: v for k, v in project_update.dict().items() if v is not None}
+    update_data = {k: v for k, v in project_update.model_dump().items() if v is not None}
     
     # Get client name if client_id provided
     if "client_id" in update_data and update_data["client_id"]:
-        client = await db.clients.find_one({"id": update_data["client_id"]})
+        client = await db.clients.find_one({"id": update_data["client_id"]}, {"_id": 0, "name": 1})
         if client:
             update_data["client_name"] = client["name"]
     
+    updated = project
     if update_data:
-        update_data["updated_at"] = datetime.now(timezone.utc).isoformat()
-        await db.projects.update_one({"id": project_id}, {"$set": update_data})
+        now_utc = datetime.now(timezone.utc)
+        update_data["updated_at"] = now_utc.isoformat()
+        updated = await db.projects.find_one_and_update(
+            {"id": project_id},
+            {"$set": update_data},
+            return_document=ReturnDocument.AFTER
+        )
         
         # If due_date changed, update all project tasks' due_date and redetermine status
         if "due_date" in update_data:
             new_due_date = update_data["due_date"]
-            now_utc = datetime.now(timezone.utc)
             
             # Parse the new due date for comparison
             if isinstance(new_due_date, str):
@@ -671,22 +824,17 @@ async def update_project(
             if parsed_due and parsed_due.tzinfo is None:
                 parsed_due = parsed_due.replace(tzinfo=timezone.utc)
             
-            # Get all non-completed, non-on_hold tasks for this project
-            task_query = {"project_id": project_id, "status": {"$nin": ["completed", "on_hold"]}}
-            tasks_to_update = await db.tasks.find(task_query).to_list(length=500)
-            
-            for task in tasks_to_update:
-                new_status = task.get("status", "pending")
-                if parsed_due:
-                    if parsed_due < now_utc:
-                        new_status = "overdue"
-                    else:
-                        new_status = "pending"
-                
-                await db.tasks.update_one(
-                    {"id": task["id"]},
-                    {"$set": {"due_date": new_due_date, "status": new_status}}
-                )
+            # Update all non-completed, non-on_hold tasks for this project in one write.
+            # The redetermined status depends only on the new due date, so there is
+            # no need to read each task back first.
+            open_task_update = {"due_date": new_due_date}
+            if parsed_due:
+                open_task_update["status"] = "overdue" if parsed_due < now_utc else "pending"
+
+            await db.tasks.update_many(
+                {"project_id": project_id, "status": {"$nin": ["completed", "on_hold"]}},
+                {"$set": open_task_update}
+            )
             
             # Update completed/on_hold tasks' due_date only (don't change their status)
             await db.tasks.update_many(
@@ -705,8 +853,8 @@ async def update_project(
             
             if task_update:
                 await db.tasks.update_many({"project_id": project_id}, {"$set": task_update})
+                invalidate_timesheet_cache()
     
-    updated = await db.projects.find_one({"id": project_id})
     return parse_from_mongo(updated)
 
 
@@ -733,6 +881,7 @@ async def delete_project(project_id: str, current_user = Depends(get_current_par
         task_query["tenant_id"] = current_user["tenant_id"]
     
     deleted_tasks = await db.tasks.delete_many(task_query)
+    invalidate_timesheet_cache()
     
     # Delete the project
     await db.projects.delete_one({"id": project_id})
@@ -840,19 +989,38 @@ async def update_project_task(
         if field in task_update and task_update[field] is not None:
             update_data[field] = task_update[field]
     
+    updated_task = task
     if update_data:
         update_data["updated_at"] = datetime.now(timezone.utc).isoformat()
-        await db.tasks.update_one({"id": task_id}, {"$set": update_data})
+        updated_task = await db.tasks.find_one_and_update(
+            {"id": task_id},
+            {"$set": update_data},
+            return_document=ReturnDocument.AFTER
+        )
+        invalidate_timesheet_cache()
     
-    updated_task = await db.tasks.find_one({"id": task_id})
     return parse_from_mongo(updated_task)
 
 
 # ==================== UTILITY ROUTES ====================
 
 @router.get("/projects/{project_id}/tasks")
-async def get_project_tasks(project_id: str, current_user = Depends(get_current_user)):
-    """Get all tasks for a project"""
+async def get_project_tasks(
+    project_id: str,
+    limit: Optional[int] = None,
+    after: Optional[str] = None,
+    current_user = Depends(get_current_user)
+):
+    """
+    Get all tasks for a project.
+    
+    Pass `limit` (1-500) to page through the tasks instead: the response becomes
+    {"items": [...], "next": cursor} and `next` is passed back as `after` for the
+    following page (null on the last page).
+    """
+    if limit is not None and not 1 <= limit <= 500:
+        raise HTTPException(status_code=400, detail="limit must be between 1 and 500")
+    
     query = {"id": project_id}
     if current_user.get("tenant_id"):
         query["tenant_id"] = current_user["tenant_id"]
@@ -865,9 +1033,44 @@ async def get_project_tasks(project_id: str, current_user = Depends(get_current_
     if current_user.get("tenant_id"):
         task_query["tenant_id"] = current_user["tenant_id"]
     
-    tasks = await db.tasks.find(task_query).sort("created_at", 1).to_list(length=500)
+    if limit is None:
+        cursor = db.tasks.find(task_query, PROJECT_TASK_PROJECTION).sort(
+            [("created_at", 1), ("_id", 1)]
+        ).limit(500)
+        return [parse_from_mongo(t) async for t in cursor]
+    
+    # Keyset pagination on (created_at, _id) - the cursor is "<created_at>|<_id>", with an
+    # empty created_at for legacy tasks that have none (Mongo sorts those first)
+    if after:
+        try:
+            after_created_at, after_oid = after.rsplit("|", 1)
+            after_oid = ObjectId(after_oid)
+        except (ValueError, InvalidId):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        if after_created_at:
+            task_query["$or"] = [
+                {"created_at": {"$gt": after_created_at}},
+                {"created_at": after_created_at, "_id": {"$gt": after_oid}}
+            ]
+        else:
+            task_query["$or"] = [
+                {"created_at": None, "_id": {"$gt": after_oid}},
+                {"created_at": {"$ne": None}}
+            ]
+    
+    # Fetch one extra task to know whether another page follows
+    tasks = await db.tasks.find(task_query, {**PROJECT_TASK_PROJECTION, "_id": 1}).sort(
+        [("created_at", 1), ("_id", 1)]
+    ).limit(limit + 1).to_list(length=limit + 1)
+    
+    next_cursor = None
+    if len(tasks) > limit:
+        tasks = tasks[:limit]
+        last = tasks[-1]
+        next_cursor = f"{last.get('created_at') or ''}|{last['_id']}"
     
-    return [parse_from_mongo(t) for t in tasks]
+    # The cursor is built from the raw values above; parse_from_mongo also drops _id
+    return {"items": [parse_from_mongo(t) for t in tasks], "next": next_cursor}
 
 
 @router.post("/projects/from-template/{template_id}")
@@ -885,8 +1088,8 @@ async def create_project_from_template(
     if not template:
         raise HTTPException(status_code=404, detail="Template not found")
     
-    # Build project data
-    project_data = ProjectCreate(
+    # Query parameters are already validated - skip a second validation pass
+    project_data = ProjectCreate.model_construct(
         name=project_name,
         description=template.get("description"),
         client_id=client_id or template.get("client_id"),
@@ -897,4 +1100,4 @@ async def create_project_from_template(
         save_as_template=save_as_template
     )
     
-    return await create_project(project_data, current_user)
+    return await _create_project_impl(project_data, current_user, template=template)
@@ -8,17 +8,41 @@ from fastapi.responses import StreamingResponse
 from typing import Optional, List
 from datetime import datetime, timezone, timedelta
 from dateutil.relativedelta import relativedelta
+from cachetools import TTLCache
+from pymongo.errors import BulkWriteError
+import asyncio
 import calendar
 import uuid
 import jwt
 import io
 import pandas as pd
-from passlib.context import CryptContext
+import xlsxwriter
+from .auth_cache import get_cached_caller, cache_caller
+from .passwords import pwd_context
 
 router = APIRouter(tags=["Tasks"])
 
 security = HTTPBearer()
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+# Bulk-import lookup maps per tenant. Cleared whenever users, clients or
+# categories are written, so the TTL only bounds how long an idle entry lives.
+_reference_cache = TTLCache(maxsize=256, ttl=60)
+
+# The fields of the Task response model; anything else stored on a task stays on the server
+TASK_PROJECTION = {
+    "_id": 0, "id": 1, "title": 1, "description": 1, "client_name": 1, "category": 1,
+    "assignee_id": 1, "assignee_name": 1, "creator_id": 1, "creator_name": 1, "status": 1,
+    "priority": 1, "due_date": 1, "created_at": 1, "updated_at": 1, "completed_at": 1,
+    "estimated_hours": 1, "actual_hours": 1, "status_history": 1, "project_id": 1,
+    "project_name": 1, "is_recurring": 1, "recurrence_type": 1, "recurrence_config": 1,
+    "recurrence_end_date": 1, "parent_recurring_id": 1
+}
+# Columns of the Excel export
+TASK_EXPORT_PROJECTION = {
+    "_id": 0, "id": 1, "title": 1, "description": 1, "client_name": 1, "category": 1,
+    "assignee_name": 1, "creator_name": 1, "status": 1, "priority": 1, "due_date": 1,
+    "created_at": 1, "updated_at": 1, "completed_at": 1, "actual_hours": 1
+}
 
 
 def format_date_for_display(date_value, format_str="%Y-%m-%d"):
@@ -76,9 +100,11 @@ PasswordVerifyRequest = None
 parse_from_mongo = None
 prepare_for_mongo = None
 create_notification = None
+create_notifications_bulk = None
 update_overdue_tasks = None
 get_ist_now = None
 format_ist_datetime = None
+invalidate_timesheet_cache = None
 logger = None
 
 
@@ -87,16 +113,17 @@ def init_tasks_routes(
     _user_role, _user_response, 
     _task, _task_create, _task_update, _task_status,
     _bulk_import_result, _password_verify_request,
-    _parse_mongo, _prepare_mongo, _create_notification,
+    _parse_mongo, _prepare_mongo, _create_notification, _create_notifications_bulk,
     _update_overdue_tasks, _get_ist_now, _format_ist_datetime,
-    _logger
+    _invalidate_timesheet_cache, _logger
 ):
     """Initialize tasks routes with dependencies from main app"""
     global db, SECRET_KEY, ALGORITHM
     global UserRole, UserResponse, Task, TaskCreate, TaskUpdate, TaskStatus
     global BulkImportResult, PasswordVerifyRequest
-    global parse_from_mongo, prepare_for_mongo, create_notification
-    global update_overdue_tasks, get_ist_now, format_ist_datetime, logger
+    global parse_from_mongo, prepare_for_mongo, create_notification, create_notifications_bulk
+    global update_overdue_tasks, get_ist_now, format_ist_datetime
+    global invalidate_timesheet_cache, logger
     
     db = _db
     SECRET_KEY = _secret_key
@@ -112,14 +139,54 @@ def init_tasks_routes(
     parse_from_mongo = _parse_mongo
     prepare_for_mongo = _prepare_mongo
     create_notification = _create_notification
+    create_notifications_bulk = _create_notifications_bulk
     update_overdue_tasks = _update_overdue_tasks
     get_ist_now = _get_ist_now
     format_ist_datetime = _format_ist_datetime
+    invalidate_timesheet_cache = _invalidate_timesheet_cache
     logger = _logger
 
 
+async def ensure_tasks_indexes():
+    """Create the indexes behind the task list and lookup queries (idempotent, run at startup)"""
+    await db.tasks.create_index([("tenant_id", 1), ("assignee_id", 1), ("created_at", -1)])
+    await db.tasks.create_index([("tenant_id", 1), ("status", 1), ("created_at", -1)])
+    # The overdue sweep scans pending tasks across all tenants by due date
+    await db.tasks.create_index([("status", 1), ("due_date", 1)])
+    for collection in (db.users, db.clients, db.categories):
+        await collection.create_index([("tenant_id", 1), ("active", 1), ("name", 1)])
+    # Last: legacy duplicate ids make this one fail without blocking the others
+    await db.tasks.create_index([("id", 1)], unique=True)
+
+
 # ==================== HELPER FUNCTIONS ====================
 
+def invalidate_reference_cache():
+    """Drop the cached bulk-import lookup maps (called on user/client/category writes)"""
+    _reference_cache.clear()
+
+
+async def get_reference_maps(tenant_id):
+    """Return (name_to_user, client_names, category_names) keyed by lower-cased name"""
+    maps = _reference_cache.get(tenant_id)
+    if maps is None:
+        reference_query = {"active": True}
+        if tenant_id:
+            reference_query["tenant_id"] = tenant_id
+        users, clients, categories = await asyncio.gather(
+            db.users.find(reference_query, {"_id": 0, "id": 1, "name": 1}).to_list(length=5000),
+            db.clients.find(reference_query, {"_id": 0, "name": 1}).to_list(length=5000),
+            db.categories.find(reference_query, {"_id": 0, "name": 1}).to_list(length=5000)
+        )
+        maps = (
+            {u['name'].lower(): u for u in users},
+            {c['name'].lower(): c['name'] for c in clients},
+            {c['name'].lower(): c['name'] for c in categories}
+        )
+        _reference_cache[tenant_id] = maps
+    return maps
+
+
 def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
 
@@ -245,6 +312,11 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+    
+    cached_user = get_cached_caller("tasks", credentials.credentials)
+    if cached_user is not None:
+        return cached_user
+    
     try:
         payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=[ALGORITHM])
         user_id: str = payload.get("sub")
@@ -257,7 +329,10 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
     if user is None:
         raise credentials_exception
     
-    return UserResponse(**parse_from_mongo(user))
+    # Only successful verifications reach the cache
+    user_response = UserResponse(**parse_from_mongo(user))
+    cache_caller("tasks", credentials.credentials, user_response, payload.get("exp"))
+    return user_response
 
 
 async def get_current_partner(current_user=Depends(get_current_user)):
@@ -269,10 +344,9 @@ async def get_current_partner(current_user=Depends(get_current_user)):
     return current_user
 
 
-async def get_tenant_id(current_user):
-    """Helper to get tenant_id from current user"""
-    user_doc = await db.users.find_one({"id": current_user.id})
-    return user_doc.get("tenant_id") if user_doc else None
+def get_tenant_id(current_user):
+    """Helper to get tenant_id from current user (already loaded by get_current_user)"""
+    return current_user.tenant_id
 
 
 async def get_managed_member_ids(current_user):
@@ -294,24 +368,10 @@ def can_manage_task(current_user_role, task_assignee_id, current_user_id, manage
     return False
 
 
-# ==================== ROUTES ====================
-
-# Task Template and Bulk Import/Export endpoints (Partners only) - Must come before parameterized routes
-@router.get("/tasks/download-template")
-async def download_tasks_template(current_user=Depends(get_current_partner)):
-    """Download Excel template for bulk task import"""
-    tenant_id = await get_tenant_id(current_user)
-    
-    # Get active users, clients, and categories for reference (within tenant)
-    query = {"active": True}
-    if tenant_id:
-        query["tenant_id"] = tenant_id
-    
-    users = await db.users.find(query).to_list(length=5000)
-    clients = await db.clients.find(query).to_list(length=5000)
-    categories = await db.categories.find(query).to_list(length=5000)
-    
+def _build_template_xlsx(users, clients, categories):
+    """Build the bulk-import template workbook (runs in a worker thread)"""
     # Create sample data with headers
+    today = datetime.now(timezone.utc)
     template_data = {
         'Title': ['Review Contract for ABC Corp', 'Prepare Tax Filing', 'Client Meeting Follow-up', 'Quarterly Audit Report'],
         'Description': [
@@ -335,104 +395,205 @@ async def download_tasks_template(current_user=Depends(get_current_partner)):
         'Priority': ['high', 'medium', 'low', 'medium'],
         'Status': ['', 'pending', 'on_hold', 'completed'],
         'Due Date': [
-            (datetime.now(timezone.utc) + timedelta(days=7)).strftime('%d-%b-%Y'),
-            (datetime.now(timezone.utc) + timedelta(days=14)).strftime('%d-%b-%Y'),
-            (datetime.now(timezone.utc) + timedelta(days=3)).strftime('%d-%b-%Y'),
-            (datetime.now(timezone.utc) - timedelta(days=5)).strftime('%d-%b-%Y')
+            (today + timedelta(days=7)).strftime('%d-%b-%Y'),
+            (today + timedelta(days=14)).strftime('%d-%b-%Y'),
+            (today + timedelta(days=3)).strftime('%d-%b-%Y'),
+            (today - timedelta(days=5)).strftime('%d-%b-%Y')
         ],
         'Actual Hours': ['', '', '', '4.5']
     }
     
-    df = pd.DataFrame(template_data)
+    instructions = [
+        '1. Fill in the task information in the "Tasks" sheet',
+        '2. Title: Required - Task title/name',
+        '3. Description: Optional - Detailed task description',
+        '4. Client Name: Required - Must match existing client name exactly',
+        '5. Category: Required - Must match existing category name exactly',
+        '6. Assignee Name: Required - Name of team member to assign task',
+        '7. Priority: Required - Must be: low, medium, high, or urgent',
+        '8. Status: Optional - Must be: pending, on_hold, overdue, or completed',
+        '   - If blank, system will auto-determine based on due date',
+        '   - pending: Task is active and waiting to be worked on',
+        '   - on_hold: Task is paused',
+        '   - completed: Task is finished',
+        '9. Due Date: Optional - Format: DD-MMM-YYYY (e.g., 15-Jan-2025)',
+        '10. Actual Hours: Optional - Time spent on the task (useful for completed tasks)',
+        '',
+        'Reference sheets are provided for:',
+        '- Team Members: List of all active users with their names',
+        '- Clients: List of all active clients',
+        '- Categories: List of all active categories',
+        '',
+        'Notes:',
+        '- If Status is blank and due date is past, status will be set to "overdue"',
+        '- If Status is blank and due date is in future (or no due date), status is "pending"',
+        '- Creator will be set to the partner uploading the file',
+        '- Save the file and upload it back to import tasks'
+    ]
+    
+    # Create Excel file in memory - every sheet is plain text of known shape, so
+    # cells are written directly rather than through DataFrames and to_excel
+    output = io.BytesIO()
+    workbook = xlsxwriter.Workbook(output)
+    
+    # Add formatting
+    header_format = workbook.add_format({
+        'bold': True,
+        'bg_color': '#3B82F6',
+        'font_color': 'white',
+        'border': 1
+    })
+    # Same look as the pandas default header on the other sheets
+    reference_header_format = workbook.add_format({
+        'bold': True,
+        'border': 1,
+        'align': 'center',
+        'valign': 'top'
+    })
+    
+    def add_sheet(name, columns, fmt):
+        worksheet = workbook.add_worksheet(name)
+        worksheet.write_row(0, 0, list(columns), fmt)
+        for col_num, values in enumerate(columns.values()):
+            worksheet.write_column(1, col_num, values)
+        return worksheet
+    
+    worksheet = add_sheet('Tasks', template_data, header_format)
+    
+    # Set column widths
+    worksheet.set_column('A:A', 35)  # Title
+    worksheet.set_column('B:B', 45)  # Description
+    worksheet.set_column('C:C', 25)  # Client Name
+    worksheet.set_column('D:D', 20)  # Category
+    worksheet.set_column('E:E', 25)  # Assignee Name
+    worksheet.set_column('F:F', 12)  # Priority
+    worksheet.set_column('G:G', 12)  # Status
+    worksheet.set_column('H:H', 15)  # Due Date
+    worksheet.set_column('I:I', 12)  # Actual Hours
+    
+    # Add reference sheets
+    add_sheet(
+        'Team Members (Reference)',
+        {'Name': [u['name'] for u in users], 'Role': [u['role'] for u in users]},
+        reference_header_format
+    )
+    if clients:
+        add_sheet('Clients (Reference)', {'Client Name': [c['name'] for c in clients]}, reference_header_format)
+    if categories:
+        add_sheet('Categories (Reference)', {'Category Name': [c['name'] for c in categories]}, reference_header_format)
+    
+    # Add instructions sheet
+    add_sheet('Instructions', {'Instructions': instructions}, reference_header_format)
+    
+    workbook.close()
+    return output
+
+
+def _build_export_xlsx(tasks):
+    """Build the task export workbook (runs in a worker thread)"""
+    # Stream rows straight into the workbook: constant_memory flushes each row as it
+    # is written, and skipping the DataFrame avoids pandas' per-cell formatter
+    columns = [
+        'Task ID', 'Title', 'Description', 'Client Name', 'Category', 'Assignee', 'Creator',
+        'Status', 'Priority', 'Due Date', 'Created At', 'Updated At', 'Completed At', 'Actual Hours'
+    ]
+    status_counts = {}
+    priority_counts = {}
     
-    # Create Excel file in memory
     output = io.BytesIO()
-    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-        # Write data
-        df.to_excel(writer, sheet_name='Tasks', index=False)
-        
-        # Get workbook and worksheet for formatting
-        workbook = writer.book
-        worksheet = writer.sheets['Tasks']
-        
-        # Add formatting
-        header_format = workbook.add_format({
-            'bold': True,
-            'bg_color': '#3B82F6',
-            'font_color': 'white',
-            'border': 1
-        })
-        
-        # Format headers
-        for col_num, value in enumerate(df.columns.values):
-            worksheet.write(0, col_num, value, header_format)
-        
-        # Set column widths
-        worksheet.set_column('A:A', 35)  # Title
-        worksheet.set_column('B:B', 45)  # Description
-        worksheet.set_column('C:C', 25)  # Client Name
-        worksheet.set_column('D:D', 20)  # Category
-        worksheet.set_column('E:E', 25)  # Assignee Name
-        worksheet.set_column('F:F', 12)  # Priority
-        worksheet.set_column('G:G', 12)  # Status
-        worksheet.set_column('H:H', 15)  # Due Date
-        worksheet.set_column('I:I', 12)  # Actual Hours
-        
-        # Add reference sheets
-        # Users reference
-        users_data = {'Name': [u['name'] for u in users], 'Role': [u['role'] for u in users]}
-        users_df = pd.DataFrame(users_data)
-        users_df.to_excel(writer, sheet_name='Team Members (Reference)', index=False)
-        
-        # Clients reference
-        if clients:
-            clients_data = {'Client Name': [c['name'] for c in clients]}
-            clients_df = pd.DataFrame(clients_data)
-            clients_df.to_excel(writer, sheet_name='Clients (Reference)', index=False)
-        
-        # Categories reference
-        if categories:
-            categories_data = {'Category Name': [c['name'] for c in categories]}
-            categories_df = pd.DataFrame(categories_data)
-            categories_df.to_excel(writer, sheet_name='Categories (Reference)', index=False)
-        
-        # Add instructions sheet
-        instructions_data = {
-            'Instructions': [
-                '1. Fill in the task information in the "Tasks" sheet',
-                '2. Title: Required - Task title/name',
-                '3. Description: Optional - Detailed task description',
-                '4. Client Name: Required - Must match existing client name exactly',
-                '5. Category: Required - Must match existing category name exactly',
-                '6. Assignee Name: Required - Name of team member to assign task',
-                '7. Priority: Required - Must be: low, medium, high, or urgent',
-                '8. Status: Optional - Must be: pending, on_hold, overdue, or completed',
-                '   - If blank, system will auto-determine based on due date',
-                '   - pending: Task is active and waiting to be worked on',
-                '   - on_hold: Task is paused',
-                '   - completed: Task is finished',
-                '9. Due Date: Optional - Format: DD-MMM-YYYY (e.g., 15-Jan-2025)',
-                '10. Actual Hours: Optional - Time spent on the task (useful for completed tasks)',
-                '',
-                'Reference sheets are provided for:',
-                '- Team Members: List of all active users with their names',
-                '- Clients: List of all active clients',
-                '- Categories: List of all active categories',
-                '',
-                'Notes:',
-                '- If Status is blank and due date is past, status will be set to "overdue"',
-                '- If Status is blank and due date is in future (or no due date), status is "pending"',
-                '- Creator will be set to the partner uploading the file',
-                '- Save the file and upload it back to import tasks'
-            ]
-        }
-        instructions_df = pd.DataFrame(instructions_data)
-        instructions_df.to_excel(writer, sheet_name='Instructions', index=False)
+    workbook = xlsxwriter.Workbook(output, {'constant_memory': True})
+    worksheet = workbook.add_worksheet('All Tasks')
+    
+    # Add formatting
+    header_format = workbook.add_format({
+        'bold': True,
+        'bg_color': '#3B82F6',
+        'font_color': 'white',
+        'border': 1
+    })
+    
+    # Set column widths
+    worksheet.set_column('A:A', 36)  # Task ID
+    worksheet.set_column('B:B', 35)  # Title
+    worksheet.set_column('C:C', 45)  # Description
+    worksheet.set_column('D:D', 25)  # Client Name
+    worksheet.set_column('E:E', 20)  # Category
+    worksheet.set_column('F:F', 20)  # Assignee
+    worksheet.set_column('G:G', 20)  # Creator
+    worksheet.set_column('H:H', 12)  # Status
+    worksheet.set_column('I:I', 10)  # Priority
+    worksheet.set_column('J:M', 12)  # Dates
+    
+    worksheet.write_row(0, 0, columns, header_format)
+    for row_idx, task in enumerate(tasks, start=1):
+        task_status = task.get('status') or ''
+        priority = task.get('priority') or ''
+        status_counts[task_status] = status_counts.get(task_status, 0) + 1
+        priority_counts[priority] = priority_counts.get(priority, 0) + 1
+        worksheet.write_row(row_idx, 0, [
+            task['id'],
+            task['title'],
+            task.get('description') or '',
+            task.get('client_name') or '',
+            task.get('category') or '',
+            task.get('assignee_name') or '',
+            task.get('creator_name') or '',
+            task_status,
+            priority,
+            format_date_for_display(task.get('due_date')),
+            format_date_for_display(task.get('created_at')),
+            format_date_for_display(task.get('updated_at')),
+            format_date_for_display(task.get('completed_at')),
+            task.get('actual_hours') or ''
+        ])
+    
+    # Add summary sheet
+    summary_rows = [
+        ('Total Tasks', len(tasks)),
+        ('Pending', status_counts.get('pending', 0)),
+        ('On Hold', status_counts.get('on_hold', 0)),
+        ('Overdue', status_counts.get('overdue', 0)),
+        ('Completed', status_counts.get('completed', 0)),
+        ('', ''),
+        ('Low Priority', priority_counts.get('low', 0)),
+        ('Medium Priority', priority_counts.get('medium', 0)),
+        ('High Priority', priority_counts.get('high', 0)),
+        ('Urgent', priority_counts.get('urgent', 0))
+    ]
+    summary_sheet = workbook.add_worksheet('Summary')
+    summary_sheet.write_row(0, 0, ['Metric', 'Count'], workbook.add_format({'bold': True, 'border': 1}))
+    for row_idx, summary_row in enumerate(summary_rows, start=1):
+        summary_sheet.write_row(row_idx, 0, summary_row)
+    
+    workbook.close()
+    return output
+
+
+# ==================== ROUTES ====================
+
+# Task Template and Bulk Import/Export endpoints (Partners only) - Must come before parameterized routes
+@router.get("/tasks/download-template")
+async def download_tasks_template(current_user=Depends(get_current_partner)):
+    """Download Excel template for bulk task import"""
+    tenant_id = get_tenant_id(current_user)
+    
+    # Get active users, clients, and categories for reference (within tenant)
+    query = {"active": True}
+    if tenant_id:
+        query["tenant_id"] = tenant_id
     
+    users, clients, categories = await asyncio.gather(
+        db.users.find(query, {"_id": 0, "name": 1, "role": 1}).to_list(length=5000),
+        db.clients.find(query, {"_id": 0, "name": 1}).to_list(length=5000),
+        db.categories.find(query, {"_id": 0, "name": 1}).to_list(length=5000)
+    )
+    
+    # Building the workbook is CPU-bound - keep it off the event loop
+    output = await asyncio.to_thread(_build_template_xlsx, users, clients, categories)
     output.seek(0)
     
     return StreamingResponse(
-        io.BytesIO(output.read()),
+        output,
         media_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
         headers={"Content-Disposition": "attachment; filename=tasks_template.xlsx"}
     )
@@ -449,17 +610,19 @@ async def bulk_import_tasks(
         raise HTTPException(status_code=400, detail="File must be Excel (.xlsx, .xls) or CSV (.csv)")
     
     # Get tenant_id for the current user
-    tenant_id = await get_tenant_id(current_user)
+    tenant_id = get_tenant_id(current_user)
     
     try:
         # Read file content
         content = await file.read()
         
         # Parse file based on extension
+        # Parsing runs in a worker thread so large uploads don't block the event loop
         if file.filename.endswith('.csv'):
-            df = pd.read_csv(io.StringIO(content.decode('utf-8')))
+            # The C parser decodes the bytes itself - no intermediate decoded str copy
+            df = await asyncio.to_thread(pd.read_csv, io.BytesIO(content), encoding='utf-8')
         else:
-            df = pd.read_excel(io.BytesIO(content), sheet_name='Tasks')
+            df = await asyncio.to_thread(pd.read_excel, io.BytesIO(content), sheet_name='Tasks')
         
         # Validate required columns
         required_columns = ['Title', 'Client Name', 'Category', 'Assignee Name', 'Priority']
@@ -470,93 +633,98 @@ async def bulk_import_tasks(
                 detail=f"Missing required columns: {', '.join(missing_columns)}"
             )
         
-        # Get all users for name lookup (within tenant)
-        user_query = {"active": True}
-        if tenant_id:
-            user_query["tenant_id"] = tenant_id
-        users = await db.users.find(user_query).to_list(length=5000)
-        name_to_user = {u['name'].lower(): u for u in users}
-        
-        # Get all clients and categories for validation (within tenant)
-        client_query = {"active": True}
-        if tenant_id:
-            client_query["tenant_id"] = tenant_id
-        clients = await db.clients.find(client_query).to_list(length=5000)
-        client_names = {c['name'].lower(): c['name'] for c in clients}
-        
-        category_query = {"active": True}
-        if tenant_id:
-            category_query["tenant_id"] = tenant_id
-        categories = await db.categories.find(category_query).to_list(length=5000)
-        category_names = {c['name'].lower(): c['name'] for c in categories}
+        # Get all users (for name lookup), clients and categories (for validation) within tenant
+        name_to_user, client_names, category_names = await get_reference_maps(tenant_id)
         
         success_count = 0
         error_count = 0
-        errors = []
+        row_errors = []  # (spreadsheet row, message), reported in row order
         created_items = []
         
+        # Valid rows are collected and written in one batch after validation
+        pending_tasks = []
+        pending_rows = []
+        
         # Valid priorities and statuses
         valid_priorities = ['low', 'medium', 'high', 'urgent']
         valid_statuses = ['pending', 'on_hold', 'overdue', 'completed']
         
+        # One timestamp for the whole import, formatted once for the status history
         now_utc = datetime.now(timezone.utc)
+        now_iso = now_utc.isoformat()
+        now_ist = format_ist_datetime(now_utc)
+        
+        # Skip empty rows
+        titles = df['Title'].astype(str).str.strip()
+        df = df[df['Title'].notna() & (titles != '')]
+        titles = titles[df.index]
+        
+        # Validate assignee, client, category and priority for all rows at once
+        client_inputs = df['Client Name'].astype(str).str.strip()
+        category_inputs = df['Category'].astype(str).str.strip()
+        assignees = df['Assignee Name'].astype(str).str.strip().str.lower().map(name_to_user)
+        actual_clients = client_inputs.str.lower().map(client_names)
+        actual_categories = category_inputs.str.lower().map(category_names)
+        priorities = df['Priority'].astype(str).str.strip().str.lower()
+        
+        assignee_ok = assignees.notna()
+        client_ok = actual_clients.notna()
+        category_ok = actual_categories.notna()
+        priority_ok = priorities.isin(valid_priorities)
+        valid_mask = assignee_ok & client_ok & category_ok & priority_ok
+        
+        # Report the first failing check of each rejected row
+        for index in df.index[~valid_mask]:
+            if not assignee_ok[index]:
+                message = f"Assignee name '{df.at[index, 'Assignee Name']}' not found"
+            elif not client_ok[index]:
+                message = f"Client '{client_inputs[index]}' not found"
+            elif not category_ok[index]:
+                message = f"Category '{category_inputs[index]}' not found"
+            else:
+                message = f"Invalid priority '{df.at[index, 'Priority']}'. Must be: low, medium, high, or urgent"
+            row_errors.append((index + 2, message))
+            error_count += 1
         
-        # Process each row
-        for index, row in df.iterrows():
+        # Only rows that passed the lookups are walked one by one, zipped with the
+        # already-normalized columns as plain arrays (no per-row label lookups)
+        valid_df = df[valid_mask]
+        
+        # Parse due dates in the DD-MMM-YYYY format (e.g. 15-Jan-2025) column-wide;
+        # cells Excel already typed as dates need no parsing at all
+        if 'Due Date' not in valid_df.columns:
+            parsed_due_dates = pd.Series(pd.NaT, index=valid_df.index)
+        elif pd.api.types.is_datetime64_any_dtype(valid_df['Due Date']):
+            parsed_due_dates = valid_df['Due Date']
+        else:
+            parsed_due_dates = pd.to_datetime(
+                valid_df['Due Date'].astype(str).str.strip(), format='%d-%b-%Y', errors='coerce'
+            )
+        
+        valid_rows = zip(
+            valid_df.index,
+            valid_df.to_dict('records'),
+            titles[valid_mask].to_numpy(),
+            assignees[valid_mask].to_numpy(),
+            actual_clients[valid_mask].to_numpy(),
+            actual_categories[valid_mask].to_numpy(),
+            priorities[valid_mask].to_numpy(),
+            parsed_due_dates.tolist()
+        )
+        for index, row, title, assignee, actual_client_name, actual_category, priority, due_date in valid_rows:
             try:
-                # Skip empty rows
-                if pd.isna(row['Title']) or str(row['Title']).strip() == '':
-                    continue
-                
-                title = str(row['Title']).strip()
-                
-                # Validate and get assignee by name
-                assignee_name = str(row['Assignee Name']).strip().lower()
-                if assignee_name not in name_to_user:
-                    errors.append(f"Row {index + 2}: Assignee name '{row['Assignee Name']}' not found")
-                    error_count += 1
-                    continue
-                assignee = name_to_user[assignee_name]
-                
-                # Validate client
-                client_name = str(row['Client Name']).strip()
-                if client_name.lower() not in client_names:
-                    errors.append(f"Row {index + 2}: Client '{client_name}' not found")
-                    error_count += 1
-                    continue
-                actual_client_name = client_names[client_name.lower()]
-                
-                # Validate category
-                category = str(row['Category']).strip()
-                if category.lower() not in category_names:
-                    errors.append(f"Row {index + 2}: Category '{category}' not found")
-                    error_count += 1
-                    continue
-                actual_category = category_names[category.lower()]
-                
-                # Validate priority
-                priority = str(row['Priority']).strip().lower()
-                if priority not in valid_priorities:
-                    errors.append(f"Row {index + 2}: Invalid priority '{row['Priority']}'. Must be: low, medium, high, or urgent")
-                    error_count += 1
-                    continue
-                
-                # Parse due date if provided (DD-MMM-YYYY format like 15-Jan-2025)
-                due_date = None
-                if 'Due Date' in row and pd.notna(row['Due Date']):
-                    try:
-                        date_str = str(row['Due Date']).strip()
-                        # Try DD-MMM-YYYY format first (e.g., 15-Jan-2025)
-                        try:
-                            due_date = datetime.strptime(date_str, '%d-%b-%Y')
-                        except ValueError:
-                            # Fallback: try pandas date parsing for Excel date values
-                            due_date = pd.to_datetime(row['Due Date'])
-                        due_date = due_date.replace(tzinfo=timezone.utc)
-                    except Exception:
-                        errors.append(f"Row {index + 2}: Invalid date format '{row['Due Date']}'. Use DD-MMM-YYYY (e.g., 15-Jan-2025)")
+                # Due date if provided - cells that missed the DD-MMM-YYYY parse
+                # fall back to pandas' general date parsing
+                if pd.isna(row.get('Due Date')):
+                    due_date = None
+                else:
+                    if pd.isna(due_date):
+                        due_date = pd.to_datetime(row['Due Date'], errors='coerce')
+                    if pd.isna(due_date):
+                        row_errors.append((index + 2, f"Invalid date format '{row['Due Date']}'. Use DD-MMM-YYYY (e.g., 15-Jan-2025)"))
                         error_count += 1
                         continue
+                    due_date = due_date.to_pydatetime().replace(tzinfo=timezone.utc)
                 
                 # Parse status - if provided, validate; if not, auto-determine
                 task_status = TaskStatus.PENDING  # Default
@@ -566,7 +734,7 @@ async def bulk_import_tasks(
                 if 'Status' in row and pd.notna(row['Status']) and str(row['Status']).strip() != '':
                     status_input = str(row['Status']).strip().lower()
                     if status_input not in valid_statuses:
-                        errors.append(f"Row {index + 2}: Invalid status '{row['Status']}'. Must be: pending, on_hold, overdue, or completed")
+                        row_errors.append((index + 2, f"Invalid status '{row['Status']}'. Must be: pending, on_hold, overdue, or completed"))
                         error_count += 1
                         continue
                     task_status = status_input
@@ -577,7 +745,7 @@ async def bulk_import_tasks(
                             try:
                                 actual_hours = float(row['Actual Hours'])
                             except ValueError:
-                                errors.append(f"Row {index + 2}: Invalid Actual Hours '{row['Actual Hours']}'. Must be a number.")
+                                row_errors.append((index + 2, f"Invalid Actual Hours '{row['Actual Hours']}'. Must be a number."))
                                 error_count += 1
                                 continue
                         completed_at = now_utc
@@ -609,36 +777,55 @@ async def bulk_import_tasks(
                     "tenant_id": tenant_id,  # Add tenant_id
                     "status_history": [{
                         "status": task_status,
-                        "changed_at": now_utc.isoformat(),
-                        "changed_at_ist": format_ist_datetime(now_utc),
+                        "changed_at": now_iso,
+                        "changed_at_ist": now_ist,
                         "changed_by": current_user.name,
                         "action": "imported"
                     }]
                 }
                 
-                task_dict = prepare_for_mongo(task_dict)
-                await db.tasks.insert_one(task_dict)
-                
-                # Create notification for assignee (only for non-completed tasks)
-                if assignee['id'] != current_user.id and task_status != TaskStatus.COMPLETED:
-                    await create_notification(
-                        user_id=assignee['id'],
-                        title="New Task Assigned",
-                        message=f"You have been assigned a new task: {title}",
-                        task_id=task_dict['id']
-                    )
-                
-                success_count += 1
-                created_items.append(title)
+                pending_tasks.append(prepare_for_mongo(task_dict))
+                pending_rows.append(index + 2)
                 
             except Exception as e:
                 error_count += 1
-                errors.append(f"Row {index + 2}: {str(e)}")
+                row_errors.append((index + 2, str(e)))
+        
+        # Insert all valid rows at once; unordered so one bad document doesn't stop the rest
+        failed = set()
+        if pending_tasks:
+            try:
+                await db.tasks.insert_many(pending_tasks, ordered=False)
+            except BulkWriteError as bwe:
+                for write_error in bwe.details.get("writeErrors", []):
+                    failed.add(write_error["index"])
+                    error_count += 1
+                    row_errors.append((pending_rows[write_error["index"]], write_error.get("errmsg")))
+        
+        notifications = []
+        for i, task_dict in enumerate(pending_tasks):
+            if i in failed:
+                continue
+            success_count += 1
+            created_items.append(task_dict["title"])
+            
+            # Create notification for assignee (only for non-completed tasks)
+            if task_dict["assignee_id"] != current_user.id and task_dict["status"] != TaskStatus.COMPLETED:
+                notifications.append({
+                    "user_id": task_dict["assignee_id"],
+                    "title": "New Task Assigned",
+                    "message": f"You have been assigned a new task: {task_dict['title']}",
+                    "task_id": task_dict['id']
+                })
+        await create_notifications_bulk(notifications)
+        # Imported rows can arrive already completed
+        if success_count:
+            invalidate_timesheet_cache()
         
         return BulkImportResult(
             success_count=success_count,
             error_count=error_count,
-            errors=errors,
+            errors=[f"Row {row}: {message}" for row, message in sorted(row_errors, key=lambda e: e[0])],
             created_items=created_items
         )
         
@@ -651,97 +838,19 @@ async def export_tasks(current_user=Depends(get_current_partner)):
     """Export all tasks to Excel file (tenant-filtered)"""
     
     # Get tenant_id
-    tenant_id = await get_tenant_id(current_user)
-    
-    # Update overdue tasks before export
-    await update_overdue_tasks(tenant_id)
+    tenant_id = get_tenant_id(current_user)
     
     # Get all tasks for this tenant
     query = {}
     if tenant_id:
         query["tenant_id"] = tenant_id
-    tasks = await db.tasks.find(query).sort("created_at", -1).to_list(length=5000)
+    tasks = await db.tasks.find(query, TASK_EXPORT_PROJECTION).sort("created_at", -1).to_list(length=5000)
     
     if not tasks:
         raise HTTPException(status_code=404, detail="No tasks found to export")
     
-    # Prepare data for export
-    export_data = []
-    for task in tasks:
-        export_data.append({
-            'Task ID': task['id'],
-            'Title': task['title'],
-            'Description': task.get('description') or '',
-            'Client Name': task.get('client_name') or '',
-            'Category': task.get('category') or '',
-            'Assignee': task.get('assignee_name') or '',
-            'Creator': task.get('creator_name') or '',
-            'Status': task.get('status') or '',
-            'Priority': task.get('priority') or '',
-            'Due Date': format_date_for_display(task.get('due_date')),
-            'Created At': format_date_for_display(task.get('created_at')),
-            'Updated At': format_date_for_display(task.get('updated_at')),
-            'Completed At': format_date_for_display(task.get('completed_at')),
-            'Actual Hours': task.get('actual_hours') or ''
-        })
-    
-    df = pd.DataFrame(export_data)
-    
-    # Create Excel file in memory
-    output = io.BytesIO()
-    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-        df.to_excel(writer, sheet_name='All Tasks', index=False)
-        
-        workbook = writer.book
-        worksheet = writer.sheets['All Tasks']
-        
-        # Add formatting
-        header_format = workbook.add_format({
-            'bold': True,
-            'bg_color': '#3B82F6',
-            'font_color': 'white',
-            'border': 1
-        })
-        
-        # Format headers
-        for col_num, value in enumerate(df.columns.values):
-            worksheet.write(0, col_num, value, header_format)
-        
-        # Set column widths
-        worksheet.set_column('A:A', 36)  # Task ID
-        worksheet.set_column('B:B', 35)  # Title
-        worksheet.set_column('C:C', 45)  # Description
-        worksheet.set_column('D:D', 25)  # Client Name
-        worksheet.set_column('E:E', 20)  # Category
-        worksheet.set_column('F:F', 20)  # Assignee
-        worksheet.set_column('G:G', 20)  # Creator
-        worksheet.set_column('H:H', 12)  # Status
-        worksheet.set_column('I:I', 10)  # Priority
-        worksheet.set_column('J:M', 12)  # Dates
-        
-        # Add summary sheet
-        status_counts = df['Status'].value_counts().to_dict()
-        priority_counts = df['Priority'].value_counts().to_dict()
-        
-        summary_data = {
-            'Metric': ['Total Tasks', 'Pending', 'On Hold', 'Overdue', 'Completed', '', 
-                      'Low Priority', 'Medium Priority', 'High Priority', 'Urgent'],
-            'Count': [
-                len(tasks),
-                status_counts.get('pending', 0),
-                status_counts.get('on_hold', 0),
-                status_counts.get('overdue', 0),
-                status_counts.get('completed', 0),
-                '',
-                priority_counts.get('low', 0),
-                priority_counts.get('medium', 0),
-                priority_counts.get('high', 0),
-                priority_counts.get('urgent', 0)
-            ]
-        }
-        summary_df = pd.DataFrame(summary_data)
-        summary_df.to_excel(writer, sheet_name='Summary', index=False)
-    
+    # Building the workbook is CPU-bound - keep it off the event loop
+    output = await asyncio.to_thread(_build_export_xlsx, tasks)
     output.seek(0)
     
     # Generate filename with current date
@@ -749,7 +858,7 @@ async def export_tasks(current_user=Depends(get_current_partner)):
     filename = f"tasks_export_{current_date}.xlsx"
     
     return StreamingResponse(
-        io.BytesIO(output.read()),
+        output,
         media_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
         headers={"Content-Disposition": f"attachment; filename={filename}"}
     )
@@ -759,17 +868,17 @@ async def export_tasks(current_user=Depends(get_current_partner)):
 async def create_task(task_data: dict, current_user=Depends(get_current_user)):
     """Create a new task (tenant-aware), with optional recurring task generation"""
     # Get tenant_id
-    tenant_id = await get_tenant_id(current_user)
+    tenant_id = get_tenant_id(current_user)
     
     # Get assignee and creator names (within tenant)
     assignee_query = {"id": task_data.get("assignee_id")}
     if tenant_id:
         assignee_query["tenant_id"] = tenant_id
     
-    assignee = await db.users.find_one(assignee_query)
-    creator = await db.users.find_one({"id": current_user.id})  # Use current user as creator
+    # The creator is the current user - its name is already loaded by get_current_user
+    assignee = await db.users.find_one(assignee_query, {"_id": 0, "name": 1})
     
-    if not assignee or not creator:
+    if not assignee:
         raise HTTPException(status_code=404, detail="Assignee or creator not found")
     
     # Get current IST time
@@ -788,7 +897,7 @@ async def create_task(task_data: dict, current_user=Depends(get_current_user)):
     
     task_dict["creator_id"] = current_user.id  # Set current user as creator
     task_dict["assignee_name"] = assignee["name"]
-    task_dict["creator_name"] = creator["name"]
+    task_dict["creator_name"] = current_user.name
     task_dict["created_at"] = now_utc
     task_dict["updated_at"] = now_utc
     task_dict["id"] = str(uuid.uuid4())
@@ -828,6 +937,8 @@ async def create_task(task_data: dict, current_user=Depends(get_current_user)):
     recurring_count = 0
     if is_recurring and recurrence_type:
         base_date = task_dict.get("due_date") or now_utc
+        now_iso = now_utc.isoformat()
+        now_ist = format_ist_datetime(now_utc)
         future_dates = generate_recurring_dates(
             base_date=base_date,
             recurrence_type=recurrence_type,
@@ -845,7 +956,7 @@ async def create_task(task_data: dict, current_user=Depends(get_current_user)):
                 "assignee_id": task_dict.get("assignee_id"),
                 "assignee_name": assignee["name"],
                 "creator_id": current_user.id,
-                "creator_name": creator["name"],
+                "creator_name": current_user.name,
                 "status": TaskStatus.PENDING,
                 "priority": task_dict.get("priority", "medium"),
                 "due_date": future_date.isoformat(),
@@ -858,8 +969,8 @@ async def create_task(task_data: dict, current_user=Depends(get_current_user)):
                 "project_name": task_dict.get("project_name"),
                 "status_history": [{
                     "status": TaskStatus.PENDING,
-                    "changed_at": now_utc.isoformat(),
-                    "changed_at_ist": format_ist_datetime(now_utc),
+                    "changed_at": now_iso,
+                    "changed_at_ist": now_ist,
                     "changed_by": current_user.name,
                     "action": "recurring_generated"
                 }]
@@ -885,11 +996,9 @@ async def get_tasks(
     category: Optional[str] = None
 ):
     """Get all tasks with optional filters (tenant-filtered)"""
-    # Update overdue tasks before fetching
-    await update_overdue_tasks()
-    
+    # Overdue statuses are kept current by the background sweep in server.py
     # Get tenant_id for filtering
-    tenant_id = await get_tenant_id(current_user)
+    tenant_id = get_tenant_id(current_user)
     
     query = {}
     if tenant_id:
@@ -915,14 +1024,14 @@ async def get_tasks(
     if category:
         query["category"] = category
     
-    tasks = await db.tasks.find(query).sort("created_at", -1).to_list(length=5000)
+    tasks = await db.tasks.find(query, TASK_PROJECTION).sort("created_at", -1).to_list(length=5000)
     return [Task(**parse_from_mongo(task)) for task in tasks]
 
 
 @router.get("/tasks/{task_id}")
 async def get_task(task_id: str, current_user=Depends(get_current_user)):
     """Get a specific task by ID"""
-    tenant_id = await get_tenant_id(current_user)
+    tenant_id = get_tenant_id(current_user)
     
     query = {"id": task_id}
     if tenant_id:
@@ -944,7 +1053,7 @@ async def get_task(task_id: str, current_user=Depends(get_current_user)):
 @router.put("/tasks/{task_id}")
 async def update_task(task_id: str, task_update: dict, current_user=Depends(get_current_user)):
     """Update a task"""
-    tenant_id = await get_tenant_id(current_user)
+    tenant_id = get_tenant_id(current_user)
     
     # Get the existing task (within tenant)
     query = {"id": task_id}
@@ -988,7 +1097,7 @@ async def update_task(task_id: str, task_update: dict, current_user=Depends(get_
     
     # Update assignee name if assignee_id is changed
     if "assignee_id" in update_data:
-        assignee = await db.users.find_one({"id": update_data["assignee_id"]})
+        assignee = await db.users.find_one({"id": update_data["assignee_id"]}, {"_id": 0, "name": 1})
         if not assignee:
             raise HTTPException(status_code=404, detail="Assignee not found")
         update_data["assignee_name"] = assignee["name"]
@@ -1032,6 +1141,7 @@ async def update_task(task_id: str, task_update: dict, current_user=Depends(get_
     
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Task not found")
+    invalidate_timesheet_cache()
     
     updated_task = await db.tasks.find_one({"id": task_id})
     
@@ -1039,23 +1149,27 @@ async def update_task(task_id: str, task_update: dict, current_user=Depends(get_
     if current_user.role == UserRole.PARTNER:
         # If assignee changed, notify both old and new assignee
         if "assignee_id" in update_data and update_data["assignee_id"] != original_assignee_id:
+            reassignment_notifications = []
             # Notify new assignee
             if update_data["assignee_id"] != current_user.id:
-                await create_notification(
-                    user_id=update_data["assignee_id"],
-                    title="Task Reassigned to You",
-                    message=f"You have been assigned to task: {updated_task['title']}",
-                    task_id=task_id
-                )
+                reassignment_notifications.append({
+                    "user_id": update_data["assignee_id"],
+                    "title": "Task Reassigned to You",
+                    "message": f"You have been assigned to task: {updated_task['title']}",
+                    "task_id": task_id
+                })
             
             # Notify old assignee (if different from partner and new assignee)
             if original_assignee_id != current_user.id and original_assignee_id != update_data["assignee_id"]:
-                await create_notification(
-                    user_id=original_assignee_id,
-                    title="Task Reassigned",
-                    message=f"Task '{updated_task['title']}' has been reassigned",
-                    task_id=task_id
-                )
+                reassignment_notifications.append({
+                    "user_id": original_assignee_id,
+                    "title": "Task Reassigned",
+                    "message": f"Task '{updated_task['title']}' has been reassigned",
+                    "task_id": task_id
+                })
+            
+            # Both notifications go out in a single insert
+            await create_notifications_bulk(reassignment_notifications)
         else:
             # Task was edited but assignee didn't change, notify current assignee
             if updated_task["assignee_id"] != current_user.id:
@@ -1072,7 +1186,7 @@ async def update_task(task_id: str, task_update: dict, current_user=Depends(get_
 @router.delete("/tasks/{task_id}")
 async def delete_task(task_id: str, current_user=Depends(get_current_partner)):
     """Delete a task (Partners only, tenant-filtered)"""
-    tenant_id = await get_tenant_id(current_user)
+    tenant_id = get_tenant_id(current_user)
     
     query = {"id": task_id}
     if tenant_id:
@@ -1081,6 +1195,7 @@ async def delete_task(task_id: str, current_user=Depends(get_current_partner)):
     result = await db.tasks.delete_one(query)
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Task not found")
+    invalidate_timesheet_cache()
     return {"message": "Task deleted successfully"}
 
 
@@ -1092,25 +1207,25 @@ async def delete_all_completed_tasks(
     """Delete all completed tasks (Partners only, tenant-filtered, requires password verification)"""
     # Verify password
     user = await db.users.find_one({"id": current_user.id})
-    if not user or not verify_password(password_verify.get("password"), user["password_hash"]):
+    # Password hashing is deliberately slow - verify in a worker thread, not on the event loop
+    if not user or not await asyncio.to_thread(
+        verify_password, password_verify.get("password"), user["password_hash"]
+    ):
         raise HTTPException(status_code=401, detail="Invalid password")
     
     # Get tenant_id
-    tenant_id = await get_tenant_id(current_user)
+    tenant_id = get_tenant_id(current_user)
     
     # Build query with tenant filter
     query = {"status": TaskStatus.COMPLETED}
     if tenant_id:
         query["tenant_id"] = tenant_id
     
-    # Count completed tasks before deletion
-    count = await db.tasks.count_documents(query)
-    
-    if count == 0:
-        return {"message": "No completed tasks to delete", "deleted_count": 0}
-    
-    # Delete all completed tasks for this tenant
+    # Delete all completed tasks for this tenant - deleted_count tells us if there were none
     result = await db.tasks.delete_many(query)
+    if result.deleted_count == 0:
+        return {"message": "No completed tasks to delete", "deleted_count": 0}
+    invalidate_timesheet_cache()
     
     return {
         "message": f"Successfully deleted {result.deleted_count} completed task(s)",
@@ -1126,25 +1241,25 @@ async def delete_all_tasks(
     """Delete all tasks regardless of status (Partners only, tenant-filtered, requires password verification)"""
     # Verify password
     user = await db.users.find_one({"id": current_user.id})
-    if not user or not verify_password(password_verify.get("password"), user["password_hash"]):
+    # Password hashing is deliberately slow - verify in a worker thread, not on the event loop
+    if not user or not await asyncio.to_thread(
+        verify_password, password_verify.get("password"), user["password_hash"]
+    ):
         raise HTTPException(status_code=401, detail="Invalid password")
     
     # Get tenant_id
-    tenant_id = await get_tenant_id(current_user)
+    tenant_id = get_tenant_id(current_user)
     
     # Build query with tenant filter
     query = {}
     if tenant_id:
         query["tenant_id"] = tenant_id
     
-    # Count all tasks before deletion
-    count = await db.tasks.count_documents(query)
-    
-    if count == 0:
-        return {"message": "No tasks to delete", "deleted_count": 0}
-    
-    # Delete all tasks for this tenant
+    # Delete all tasks for this tenant - deleted_count tells us if there were none
     result = await db.tasks.delete_many(query)
+    if result.deleted_count == 0:
+        return {"message": "No tasks to delete", "deleted_count": 0}
+    invalidate_timesheet_cache()
     
     return {
         "message": f"Successfully deleted {result.deleted_count} task(s)",
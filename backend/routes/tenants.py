@@ -7,18 +7,28 @@ from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel, Field
 from typing import Optional, List
 from datetime import datetime, timezone, timedelta
+import asyncio
 import uuid
 import jwt
 import re
-import random
+import secrets
 import string
-from passlib.context import CryptContext
+from .passwords import pwd_context
+from .unique_indexes import ensure_unique_index, has_unique_index
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
 
 router = APIRouter(tags=["Tenants"])
 
 security = HTTPBearer()
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# The fields list_tenant_users returns - keeps password hashes out of the response path
+TENANT_USER_PROJECTION = {
+    "_id": 0, "id": 1, "name": 1, "email": 1, "role": 1, "active": 1, "created_at": 1
+}
+
+# Company codes are 4-8 ASCII alphanumerics
+_COMPANY_CODE_RE = re.compile(r'[A-Za-z0-9]{4,8}')
 
 # These will be set by server.py when including the router
 db = None
@@ -47,6 +57,21 @@ def init_tenants_routes(
     logger = _logger
 
 
+async def ensure_tenants_indexes():
+    """Create the indexes behind super-admin auth, tenant lookups and dashboard counts (idempotent, run at startup)"""
+    # (tenant_id, active) user listings are served by the prefix of the tasks module's
+    # (tenant_id, active, name) index, and code lookups by the unique code index below
+    await db.tenants.create_index([("active", 1)])
+    await db.users.create_index([("active", 1)])
+    await db.super_admins.create_index([("id", 1), ("active", 1)])
+    # Last, each on its own: legacy duplicates make one fail without blocking the others
+    for collection, field in (
+        (db.tenants, "id"), (db.tenants, "code"),
+        (db.super_admins, "email"), (db.users, "id")
+    ):
+        await ensure_unique_index(collection, [field], logger)
+
+
 # ==================== MODELS ====================
 
 class TenantCreate(BaseModel):
@@ -109,18 +134,25 @@ class ImpersonateRequest(BaseModel):
 def generate_company_code(length: int = 6) -> str:
     """Generate a random alphanumeric company code (4-8 chars)"""
     chars = string.ascii_uppercase + string.digits
-    return ''.join(random.choices(chars, k=length))
+    return ''.join(secrets.choice(chars) for _ in range(length))
+
+
+async def pick_company_code():
+    """Pick an unused generated company code, checking a batch of candidates in one query"""
+    while True:
+        candidates = {generate_company_code(6) for _ in range(8)}
+        taken = {
+            doc["code"] async for doc in
+            db.tenants.find({"code": {"$in": list(candidates)}}, {"_id": 0, "code": 1})
+        }
+        free = candidates - taken
+        if free:
+            return free.pop()
 
 
 def validate_company_code(code: str) -> bool:
     """Validate company code format: 4-8 alphanumeric characters"""
-    if not code:
-        return False
-    if len(code) < 4 or len(code) > 8:
-        return False
-    if not re.match(r'^[A-Za-z0-9]+$', code):
-        return False
-    return True
+    return bool(code and _COMPANY_CODE_RE.fullmatch(code))
 
 
 def get_password_hash(password):
@@ -131,6 +163,11 @@ def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
 
 
+def verify_and_update_password(plain_password, hashed_password):
+    """Verify a password; also returns a fresh argon2 hash when the stored one is deprecated"""
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -142,6 +179,28 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     return encoded_jwt
 
 
+async def count_by_tenant(collection, tenant_ids):
+    """Count documents per tenant for the given tenant ids in a single aggregation"""
+    if not tenant_ids:
+        return {}
+    pipeline = [
+        {"$match": {"tenant_id": {"$in": tenant_ids}}},
+        {"$group": {"_id": "$tenant_id", "count": {"$sum": 1}}}
+    ]
+    return {row["_id"]: row["count"] async for row in collection.aggregate(pipeline)}
+
+
+async def _batched_delete(collection, filt, batch=5000):
+    """Delete matching documents in bounded _id batches so large tenants don't hit lock/time limits"""
+    deleted_count = 0
+    while True:
+        ids = [doc["_id"] async for doc in collection.find(filt, {"_id": 1}).limit(batch)]
+        if not ids:
+            return deleted_count
+        result = await collection.delete_many({"_id": {"$in": ids}})
+        deleted_count += result.deleted_count
+
+
 async def get_super_admin(credentials: HTTPAuthorizationCredentials = Depends(security)):
     """Get current super admin from token - supports both super_admins collection and users with super_admin role"""
     credentials_exception = HTTPException(
@@ -149,6 +208,7 @@ async def get_super_admin(credentials: HTTPAuthorizationCredentials = Depends(se
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+    
     try:
         payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=[ALGORITHM])
         admin_id: str = payload.get("sub")
@@ -162,19 +222,20 @@ async def get_super_admin(credentials: HTTPAuthorizationCredentials = Depends(se
     # First, check super_admins collection (old method)
     admin = await db.super_admins.find_one({"id": admin_id, "active": True})
     if admin:
-        return parse_from_mongo(admin)
-    
-    # Then, check users collection for super_admin role
-    user = await db.users.find_one({"id": admin_id, "active": True})
-    if user and (user.get("role") == "super_admin" or is_super_admin_flag):
-        return {
+        resolved = parse_from_mongo(admin)
+    else:
+        # Then, check users collection for super_admin role
+        user = await db.users.find_one({"id": admin_id, "active": True})
+        if not user or (user.get("role") != "super_admin" and not is_super_admin_flag):
+            raise credentials_exception
+        resolved = {
             "id": user["id"],
             "name": user.get("name", "Admin"),
             "email": user.get("email", ""),
             "role": "super_admin"
         }
     
-    raise credentials_exception
+    return resolved
 
 
 # ==================== SUPER ADMIN ROUTES ====================
@@ -183,12 +244,23 @@ async def get_super_admin(credentials: HTTPAuthorizationCredentials = Depends(se
 async def super_admin_login(login_data: SuperAdminLogin):
     """Super admin login - separate from tenant user login"""
     admin = await db.super_admins.find_one({"email": login_data.email, "active": True})
-    if not admin or not verify_password(login_data.password, admin.get("password_hash", "")):
+    if not admin:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid credentials"
         )
     
+    verified, new_hash = await asyncio.to_thread(
+        verify_and_update_password, login_data.password, admin.get("password_hash", "")
+    )
+    if not verified:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid credentials"
+        )
+    if new_hash:
+        await db.super_admins.update_one({"id": admin["id"]}, {"$set": {"password_hash": new_hash}})
+    
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES or 60)
     access_token = create_access_token(
         data={"sub": admin["id"], "role": "super_admin"},
@@ -222,30 +294,32 @@ async def get_super_admin_info(admin=Depends(get_super_admin)):
 async def create_super_admin(admin_data: SuperAdminCreate):
     """Create a new super admin (only works if no super admins exist)"""
     # Check if any super admin exists
-    existing_count = await db.super_admins.count_documents({})
-    if existing_count > 0:
+    existing_admin = await db.super_admins.find_one({}, {"_id": 1})
+    if existing_admin:
         # If super admins exist, require authentication
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Super admin already exists. Contact existing admin."
         )
     
-    # Check if email already exists
-    existing = await db.super_admins.find_one({"email": admin_data.email})
-    if existing:
-        raise HTTPException(status_code=400, detail="Email already registered")
-    
     admin_dict = {
         "id": str(uuid.uuid4()),
         "name": admin_data.name,
         "email": admin_data.email,
-        "password_hash": get_password_hash(admin_data.password),
+        "password_hash": await asyncio.to_thread(get_password_hash, admin_data.password),
         "active": True,
         "created_at": datetime.now(timezone.utc)
     }
     
     admin_dict = prepare_for_mongo(admin_dict)
-    await db.super_admins.insert_one(admin_dict)
+    # The unique email index rejects duplicates; look up only while it is missing
+    if not has_unique_index("super_admins", "email"):
+        if await db.super_admins.find_one({"email": admin_data.email}, {"_id": 1}):
+            raise HTTPException(status_code=400, detail="Email already registered")
+    try:
+        await db.super_admins.insert_one(admin_dict)
+    except DuplicateKeyError:
+        raise HTTPException(status_code=400, detail="Email already registered")
     
     return {
         "message": "Super admin created successfully",
@@ -278,17 +352,12 @@ async def create_tenant(tenant_data: TenantCreate, admin=Depends(get_super_admin
                 status_code=400,
                 detail="Company code must be 4-8 alphanumeric characters"
             )
-        # Check if code already exists
-        existing = await db.tenants.find_one({"code": code})
-        if existing:
-            raise HTTPException(status_code=400, detail="Company code already exists")
+        # The unique code index rejects taken codes on insert; look up only while it is missing
+        if not has_unique_index("tenants", "code"):
+            if await db.tenants.find_one({"code": code}, {"_id": 1}):
+                raise HTTPException(status_code=400, detail="Company code already exists")
     else:
-        # Generate unique code
-        while True:
-            code = generate_company_code(6)
-            existing = await db.tenants.find_one({"code": code})
-            if not existing:
-                break
+        code = await pick_company_code()
     
     # Check if partner email already exists
     existing_user = await db.users.find_one({"email": tenant_data.partner_email})
@@ -311,15 +380,25 @@ async def create_tenant(tenant_data: TenantCreate, admin=Depends(get_super_admin
         "created_by": admin["id"]
     }
     
+    # Keep the Python-typed values for the response; prepare_for_mongo converts in place
+    response_data = dict(tenant_dict)
     tenant_dict = prepare_for_mongo(tenant_dict)
-    await db.tenants.insert_one(tenant_dict)
+    # The unique code index rejects taken codes, including races with pick_company_code
+    while True:
+        try:
+            await db.tenants.insert_one(tenant_dict)
+            break
+        except DuplicateKeyError:
+            if tenant_data.code:
+                raise HTTPException(status_code=400, detail="Company code already exists")
+            code = tenant_dict["code"] = await pick_company_code()
     
     # Create partner user for this tenant
     partner_dict = {
         "id": str(uuid.uuid4()),
         "name": tenant_data.partner_name,
         "email": tenant_data.partner_email,
-        "password_hash": get_password_hash(tenant_data.partner_password),
+        "password_hash": await asyncio.to_thread(get_password_hash, tenant_data.partner_password),
         "role": "partner",
         "tenant_id": tenant_id,
         "active": True,
@@ -332,7 +411,9 @@ async def create_tenant(tenant_data: TenantCreate, admin=Depends(get_super_admin
     
     logger.info(f"Tenant created: {tenant_data.name} (Code: {code}) with partner: {tenant_data.partner_email}")
     
-    return TenantResponse(**parse_from_mongo(tenant_dict))
+    # A new tenant has exactly its partner user and no tasks
+    response_data["code"] = code
+    return TenantResponse(**response_data, user_count=1, task_count=0)
 
 
 @router.get("/tenants", response_model=List[TenantResponse])
@@ -342,31 +423,43 @@ async def list_tenants(
 ):
     """List all tenants (Super Admin only)"""
     query = {} if include_inactive else {"active": True}
-    tenants = await db.tenants.find(query).sort("name", 1).to_list(length=1000)
-    
-    result = []
-    for tenant in tenants:
-        tenant_data = parse_from_mongo(tenant)
-        # Add user and task counts
-        tenant_data["user_count"] = await db.users.count_documents({"tenant_id": tenant["id"]})
-        tenant_data["task_count"] = await db.tasks.count_documents({"tenant_id": tenant["id"]})
-        result.append(TenantResponse(**tenant_data))
+    # Every tenant is listed - the set stays small, and counts need all of their ids
+    tenants = [parse_from_mongo(t) async for t in db.tenants.find(query).sort("name", 1)]
+    
+    # Add user and task counts - one grouped count per collection, run concurrently
+    tenant_ids = [t["id"] for t in tenants]
+    user_counts, task_counts = await asyncio.gather(
+        count_by_tenant(db.users, tenant_ids),
+        count_by_tenant(db.tasks, tenant_ids)
+    )
     
-    return result
+    return [
+        TenantResponse(
+            **tenant_data,
+            user_count=user_counts.get(tenant_data["id"], 0),
+            task_count=task_counts.get(tenant_data["id"], 0)
+        )
+        for tenant_data in tenants
+    ]
 
 
 @router.get("/tenants/{tenant_id}", response_model=TenantResponse)
 async def get_tenant(tenant_id: str, admin=Depends(get_super_admin)):
     """Get a specific tenant (Super Admin only)"""
-    tenant = await db.tenants.find_one({"id": tenant_id})
+    # The tenant and its counts are independent reads
+    tenant, user_counts, task_counts = await asyncio.gather(
+        db.tenants.find_one({"id": tenant_id}, {"_id": 0}),
+        count_by_tenant(db.users, [tenant_id]),
+        count_by_tenant(db.tasks, [tenant_id])
+    )
     if not tenant:
         raise HTTPException(status_code=404, detail="Tenant not found")
     
-    tenant_data = parse_from_mongo(tenant)
-    tenant_data["user_count"] = await db.users.count_documents({"tenant_id": tenant_id})
-    tenant_data["task_count"] = await db.tasks.count_documents({"tenant_id": tenant_id})
-    
-    return TenantResponse(**tenant_data)
+    return TenantResponse(
+        **parse_from_mongo(tenant),
+        user_count=user_counts.get(tenant_id, 0),
+        task_count=task_counts.get(tenant_id, 0)
+    )
 
 
 @router.put("/tenants/{tenant_id}", response_model=TenantResponse)
@@ -376,10 +469,6 @@ async def update_tenant(
     admin=Depends(get_super_admin)
 ):
     """Update a tenant (Super Admin only)"""
-    tenant = await db.tenants.find_one({"id": tenant_id})
-    if not tenant:
-        raise HTTPException(status_code=404, detail="Tenant not found")
-    
     update_data = {k: v for k, v in tenant_update.dict().items() if v is not None}
     if not update_data:
         raise HTTPException(status_code=400, detail="No update data provided")
@@ -387,31 +476,42 @@ async def update_tenant(
     update_data["updated_at"] = datetime.now(timezone.utc)
     update_data = prepare_for_mongo(update_data)
     
-    await db.tenants.update_one({"id": tenant_id}, {"$set": update_data})
-    
-    updated_tenant = await db.tenants.find_one({"id": tenant_id})
-    tenant_data = parse_from_mongo(updated_tenant)
-    tenant_data["user_count"] = await db.users.count_documents({"tenant_id": tenant_id})
-    tenant_data["task_count"] = await db.tasks.count_documents({"tenant_id": tenant_id})
+    # Existence check, update and re-read in one round-trip
+    tenant = await db.tenants.find_one_and_update(
+        {"id": tenant_id},
+        {"$set": update_data},
+        projection={"_id": 0},
+        return_document=ReturnDocument.AFTER
+    )
+    if not tenant:
+        raise HTTPException(status_code=404, detail="Tenant not found")
     
-    return TenantResponse(**tenant_data)
+    user_counts, task_counts = await asyncio.gather(
+        count_by_tenant(db.users, [tenant_id]),
+        count_by_tenant(db.tasks, [tenant_id])
+    )
+    return TenantResponse(
+        **parse_from_mongo(tenant),
+        user_count=user_counts.get(tenant_id, 0),
+        task_count=task_counts.get(tenant_id, 0)
+    )
 
 
 @router.delete("/tenants/{tenant_id}")
 async def deactivate_tenant(tenant_id: str, admin=Depends(get_super_admin)):
     """Deactivate a tenant (Super Admin only) - preserves data"""
-    tenant = await db.tenants.find_one({"id": tenant_id})
+    # The state check lives in the filter, so the success path is a single write.
+    # Tenants without an active field count as active.
+    tenant = await db.tenants.find_one_and_update(
+        {"id": tenant_id, "active": {"$ne": False}},
+        {"$set": {"active": False, "deactivated_at": datetime.now(timezone.utc).isoformat()}},
+        projection={"_id": 0, "name": 1, "code": 1}
+    )
     if not tenant:
+        if await db.tenants.find_one({"id": tenant_id}, {"_id": 1}):
+            raise HTTPException(status_code=400, detail="Tenant is already deactivated")
         raise HTTPException(status_code=404, detail="Tenant not found")
     
-    if not tenant.get("active", True):
-        raise HTTPException(status_code=400, detail="Tenant is already deactivated")
-    
-    await db.tenants.update_one(
-        {"id": tenant_id},
-        {"$set": {"active": False, "deactivated_at": datetime.now(timezone.utc).isoformat()}}
-    )
-    
     logger.info(f"Tenant deactivated: {tenant['name']} (Code: {tenant['code']})")
     
     return {"message": f"Tenant '{tenant['name']}' has been deactivated"}
@@ -420,18 +520,17 @@ async def deactivate_tenant(tenant_id: str, admin=Depends(get_super_admin)):
 @router.put("/tenants/{tenant_id}/reactivate")
 async def reactivate_tenant(tenant_id: str, admin=Depends(get_super_admin)):
     """Reactivate a deactivated tenant (Super Admin only)"""
-    tenant = await db.tenants.find_one({"id": tenant_id})
+    # Only an explicit active=False matches - a missing field means active
+    tenant = await db.tenants.find_one_and_update(
+        {"id": tenant_id, "active": False},
+        {"$set": {"active": True}, "$unset": {"deactivated_at": ""}},
+        projection={"_id": 0, "name": 1}
+    )
     if not tenant:
+        if await db.tenants.find_one({"id": tenant_id}, {"_id": 1}):
+            raise HTTPException(status_code=400, detail="Tenant is already active")
         raise HTTPException(status_code=404, detail="Tenant not found")
     
-    if tenant.get("active", True):
-        raise HTTPException(status_code=400, detail="Tenant is already active")
-    
-    await db.tenants.update_one(
-        {"id": tenant_id},
-        {"$set": {"active": True}, "$unset": {"deactivated_at": ""}}
-    )
-    
     return {"message": f"Tenant '{tenant['name']}' has been reactivated"}
 
 
@@ -452,53 +551,49 @@ async def delete_tenant_permanently(tenant_id: str, admin=Depends(get_super_admi
     tenant_name = tenant["name"]
     tenant_code = tenant["code"]
     
-    # Delete all associated data
-    # Delete users
-    deleted_users = await db.users.delete_many({"tenant_id": tenant_id})
-    
-    # Delete tasks
-    deleted_tasks = await db.tasks.delete_many({"tenant_id": tenant_id})
-    
-    # Delete projects
-    deleted_projects = await db.projects.delete_many({"tenant_id": tenant_id})
-    
-    # Delete project templates (tenant-specific)
-    deleted_templates = await db.project_templates.delete_many({"tenant_id": tenant_id})
-    
-    # Delete categories
-    deleted_categories = await db.categories.delete_many({"tenant_id": tenant_id})
-    
-    # Delete clients
-    deleted_clients = await db.clients.delete_many({"tenant_id": tenant_id})
-    
-    # Delete attendance records
-    deleted_attendance = await db.attendance.delete_many({"tenant_id": tenant_id})
-    
-    # Delete timesheet entries
-    deleted_timesheets = await db.timesheets.delete_many({"tenant_id": tenant_id})
-    
-    # Delete notifications
-    deleted_notifications = await db.notifications.delete_many({"tenant_id": tenant_id})
+    # Delete all associated data in batches - the collections are independent, so delete concurrently
+    tenant_filter = {"tenant_id": tenant_id}
+    (
+        deleted_users,
+        deleted_tasks,
+        deleted_projects,
+        deleted_templates,  # tenant-specific project templates
+        deleted_categories,
+        deleted_clients,
+        deleted_attendance,
+        deleted_timesheets,
+        deleted_notifications
+    ) = await asyncio.gather(
+        _batched_delete(db.users, tenant_filter),
+        _batched_delete(db.tasks, tenant_filter),
+        _batched_delete(db.projects, tenant_filter),
+        _batched_delete(db.project_templates, tenant_filter),
+        _batched_delete(db.categories, tenant_filter),
+        _batched_delete(db.clients, tenant_filter),
+        _batched_delete(db.attendance, tenant_filter),
+        _batched_delete(db.timesheets, tenant_filter),
+        _batched_delete(db.notifications, tenant_filter)
+    )
     
     # Finally delete the tenant itself
     await db.tenants.delete_one({"id": tenant_id})
     
     logger.warning(f"Tenant PERMANENTLY DELETED: {tenant_name} (Code: {tenant_code}) by admin {admin['email']}")
-    logger.info(f"Deleted data: {deleted_users.deleted_count} users, {deleted_tasks.deleted_count} tasks, "
-                f"{deleted_projects.deleted_count} projects")
+    logger.info(f"Deleted data: {deleted_users} users, {deleted_tasks} tasks, "
+                f"{deleted_projects} projects")
     
     return {
         "message": f"Tenant '{tenant_name}' and all associated data have been permanently deleted",
         "deleted": {
-            "users": deleted_users.deleted_count,
-            "tasks": deleted_tasks.deleted_count,
-            "projects": deleted_projects.deleted_count,
-            "templates": deleted_templates.deleted_count,
-            "categories": deleted_categories.deleted_count,
-            "clients": deleted_clients.deleted_count,
-            "attendance": deleted_attendance.deleted_count,
-            "timesheets": deleted_timesheets.deleted_count,
-            "notifications": deleted_notifications.deleted_count
+            "users": deleted_users,
+            "tasks": deleted_tasks,
+            "projects": deleted_projects,
+            "templates": deleted_templates,
+            "categories": deleted_categories,
+            "clients": deleted_clients,
+            "attendance": deleted_attendance,
+            "timesheets": deleted_timesheets,
+            "notifications": deleted_notifications
         }
     }
 
@@ -520,8 +615,7 @@ async def list_tenant_users(
     if not include_inactive:
         query["active"] = True
     
-    users = await db.users.find(query).to_list(length=1000)
-    
+    # Stream the cursor; a tenant's user count is already bounded by its max_users
     return [{
         "id": user["id"],
         "name": user["name"],
@@ -529,7 +623,7 @@ async def list_tenant_users(
         "role": user["role"],
         "active": user.get("active", True),
         "created_at": user.get("created_at")
-    } for user in users]
+    } async for user in db.users.find(query, TENANT_USER_PROJECTION)]
 
 
 # ==================== IMPERSONATION ====================
@@ -608,19 +702,23 @@ async def lookup_tenant_by_code(code: str):
 @router.get("/super-admin/dashboard")
 async def get_super_admin_dashboard(admin=Depends(get_super_admin)):
     """Get super admin dashboard statistics"""
-    # Total tenants
-    total_tenants = await db.tenants.count_documents({})
-    active_tenants = await db.tenants.count_documents({"active": True})
-    
-    # Total users across all tenants
-    total_users = await db.users.count_documents({})
-    active_users = await db.users.count_documents({"active": True})
-    
-    # Total tasks across all tenants
-    total_tasks = await db.tasks.count_documents({})
+    # Totals come from collection metadata; the planner serves active counts from the active index
+    (
+        total_tenants, active_tenants,
+        total_users, active_users,
+        total_tasks
+    ) = await asyncio.gather(
+        db.tenants.estimated_document_count(),
+        db.tenants.count_documents({"active": True}),
+        db.users.estimated_document_count(),
+        db.users.count_documents({"active": True}),
+        db.tasks.estimated_document_count()
+    )
     
     # Recent tenants
-    recent_tenants = await db.tenants.find({}).sort("created_at", -1).limit(5).to_list(length=5)
+    recent_tenants = await db.tenants.find(
+        {}, {"_id": 0, "id": 1, "name": 1, "code": 1, "created_at": 1}
+    ).sort("created_at", -1).limit(5).to_list(length=5)
     
     return {
         "statistics": {
@@ -4,55 +4,142 @@ Handles individual and team timesheets with export functionality
 """
 from fastapi import APIRouter, HTTPException, Depends, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from fastapi.responses import StreamingResponse
-from typing import Optional
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from typing import NamedTuple, Optional
 from datetime import datetime, timezone, timedelta
+from functools import lru_cache
+from cachetools import TTLCache
+import asyncio
 import jwt
 import io
 import pandas as pd
+import xlsxwriter
+from .auth_cache import get_cached_caller, cache_caller
 
-router = APIRouter(tags=["Timesheets"])
+router = APIRouter(tags=["Timesheets"], default_response_class=ORJSONResponse)
 
 security = HTTPBearer()
 
+# Timesheet payloads keyed by tenant, view and period start. Task completions, edits and
+# deletes in the task and project routes clear it; the TTL bounds staleness from any other writer.
+_timesheet_cache = TTLCache(maxsize=512, ttl=60)
 
-def parse_datetime(date_value):
+# User display names keyed by (tenant_id, user_id). Renames are rare, so a short
+# TTL is enough to keep repeated timesheet views and exports off the users collection.
+_user_name_cache = TTLCache(maxsize=4096, ttl=30)
+
+# The task fields timesheet entries and exports read
+TIMESHEET_TASK_PROJECTION = {
+    "_id": 0, "id": 1, "assignee_id": 1, "title": 1, "client_name": 1, "category": 1,
+    "description": 1, "estimated_hours": 1, "actual_hours": 1, "completed_at": 1
+}
+
+# The user fields the team summaries read
+TEAM_USER_PROJECTION = {"_id": 0, "id": 1, "name": 1, "department": 1, "role": 1}
+
+# India Standard Time - timesheet dates and times are shown in IST
+IST = timezone(timedelta(hours=5, minutes=30))
+
+
+def to_ist(values):
+    """Convert a Series of completion timestamps (ISO strings or dates) to IST; bad values become NaT"""
+    return pd.to_datetime(values, utc=True, format="ISO8601", errors="coerce").dt.tz_convert(IST)
+
+
+def invalidate_timesheet_cache():
+    """Drop cached timesheets (called when task completion data changes)"""
+    _timesheet_cache.clear()
+
+
+class PeriodSpec(NamedTuple):
+    start: datetime
+    end: datetime  # exclusive
+    label: str  # for display, e.g. "06 Jan - 12 Jan 2025"
+    file_label: str  # for export filenames, e.g. "06Jan_to_12Jan_2025"
+
+
+class CurrentUser(NamedTuple):
+    """The caller as the timesheet routes see it; no other user fields are read here."""
+    id: str
+    role: str
+    tenant_id: Optional[str]
+
+
+CURRENT_USER_PROJECTION = {"_id": 0, "id": 1, "role": 1, "tenant_id": 1}
+
+
+def today_str():
+    """Today's UTC date as YYYY-MM-DD - the default reference date"""
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d")
+
+
+def _daily_range(ref_date):
+    end_date = ref_date + timedelta(days=1)
+    return PeriodSpec(
+        ref_date, end_date,
+        ref_date.strftime("%d %b %Y"),
+        ref_date.strftime("%d_%b_%Y")
+    )
+
+
+def _weekly_range(ref_date):
+    # Start from Monday
+    start_date = ref_date - timedelta(days=ref_date.weekday())
+    end_date = start_date + timedelta(days=7)
+    last_day = end_date - timedelta(days=1)
+    return PeriodSpec(
+        start_date, end_date,
+        f"{start_date.strftime('%d %b')} - {last_day.strftime('%d %b %Y')}",
+        f"{start_date.strftime('%d%b')}_to_{last_day.strftime('%d%b_%Y')}"
+    )
+
+
+def _monthly_range(ref_date):
+    start_date = ref_date.replace(day=1)
+    if ref_date.month == 12:
+        end_date = start_date.replace(year=ref_date.year + 1, month=1)
+    else:
+        end_date = start_date.replace(month=ref_date.month + 1)
+    return PeriodSpec(
+        start_date, end_date,
+        ref_date.strftime("%B %Y"),
+        ref_date.strftime("%B_%Y")
+    )
+
+
+_PERIOD_HANDLERS = {
+    "daily": _daily_range,
+    "weekly": _weekly_range,
+    "monthly": _monthly_range,
+}
+
+
+@lru_cache(maxsize=512)
+def resolve_period(period: str, date: str) -> PeriodSpec:
     """
-    Safely parse a date value to datetime object.
-    Handles both datetime objects (from MongoDB Atlas) and ISO strings (from local MongoDB).
-    Returns None if value is None or invalid.
+    Resolve a period and YYYY-MM-DD reference date to its UTC date range and labels.
+    Raises ValueError on a bad date, then KeyError on an unknown period.
     """
-    if date_value is None:
-        return None
-    try:
-        if isinstance(date_value, datetime):
-            return date_value
-        elif isinstance(date_value, str):
-            return datetime.fromisoformat(date_value.replace('Z', '+00:00'))
-        else:
-            return None
-    except Exception:
-        return None
+    # fromisoformat is the fast path for zero-padded dates; anything else goes through
+    # strptime, which still accepts 2025-1-5 but not the compact/week forms fromisoformat takes
+    if len(date) == 10 and date[4] == "-" and date[7] == "-":
+        ref_date = datetime.fromisoformat(date)
+    else:
+        ref_date = datetime.strptime(date, "%Y-%m-%d")
+    ref_date = ref_date.replace(tzinfo=timezone.utc)
+    return _PERIOD_HANDLERS[period](ref_date)
 
 
-def format_date_for_display(date_value, format_str="%Y-%m-%d"):
+def completed_between(start_date, end_date):
     """
-    Safely format a date value for display.
-    Handles both datetime objects and ISO strings.
-    Returns empty string if value is None or invalid.
+    Query fragment matching completed_at in [start_date, end_date).
+    completed_at is an ISO string on most tasks but a native date on some, and Mongo
+    range operators only compare within one BSON type, so both forms are matched.
     """
-    if date_value is None:
-        return ''
-    try:
-        if isinstance(date_value, datetime):
-            return date_value.strftime(format_str)
-        elif isinstance(date_value, str):
-            dt = datetime.fromisoformat(date_value.replace('Z', '+00:00'))
-            return dt.strftime(format_str)
-        else:
-            return str(date_value)[:10] if date_value else ''
-    except Exception:
-        return ''
+    return {"$or": [
+        {"completed_at": {"$gte": start_date.isoformat(), "$lt": end_date.isoformat()}},
+        {"completed_at": {"$gte": start_date, "$lt": end_date}}
+    ]}
 
 
 # These will be set by server.py when including the router
@@ -86,14 +173,39 @@ def init_timesheets_routes(
     logger = _logger
 
 
+async def ensure_timesheets_indexes():
+    """Create the index behind the completed-task range queries (idempotent, run at startup)"""
+    await db.tasks.create_index([("assignee_id", 1), ("status", 1), ("completed_at", 1)])
+
+
 # ==================== HELPER FUNCTIONS ====================
 
-async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+async def get_user_name(user_id, tenant_id):
+    """A user's name within the tenant ("Unknown" if there is no such user), briefly cached"""
+    cache_key = (tenant_id, user_id)
+    user_name = _user_name_cache.get(cache_key)
+    if user_name is None:
+        user_query = {"id": user_id}
+        if tenant_id:
+            user_query["tenant_id"] = tenant_id
+        user = await db.users.find_one(user_query, {"_id": 0, "name": 1})
+        if not user:
+            return "Unknown"
+        user_name = _user_name_cache[cache_key] = user["name"]
+    return user_name
+
+
+async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> CurrentUser:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+    
+    cached_user = get_cached_caller("timesheets", credentials.credentials)
+    if cached_user is not None:
+        return cached_user
+    
     try:
         payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=[ALGORITHM])
         user_id: str = payload.get("sub")
@@ -102,10 +214,14 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
     except jwt.PyJWTError:
         raise credentials_exception
     
-    user = await db.users.find_one({"id": user_id, "active": True})
+    user = await db.users.find_one({"id": user_id, "active": True}, CURRENT_USER_PROJECTION)
     if user is None:
         raise credentials_exception
-    return UserResponse(**parse_from_mongo(user))
+    
+    # Only successful verifications reach the cache
+    current_user = CurrentUser(user["id"], user["role"], user.get("tenant_id"))
+    cache_caller("timesheets", credentials.credentials, current_user, payload.get("exp"))
+    return current_user
 
 
 async def get_current_partner(current_user=Depends(get_current_user)):
@@ -117,6 +233,31 @@ async def get_current_partner(current_user=Depends(get_current_user)):
     return current_user
 
 
+def _build_timesheet_xlsx(sheets):
+    """Build a workbook from (sheet name, DataFrame, column widths) triples (runs in a worker thread)"""
+    # constant_memory flushes each row once it is written, but only accepts rows in
+    # order - pandas' to_excel writes column by column, so rows are written here instead
+    output = io.BytesIO()
+    workbook = xlsxwriter.Workbook(output, {'constant_memory': True})
+    # The header style pandas' to_excel used
+    header_format = workbook.add_format({'bold': True, 'border': 1, 'align': 'center', 'valign': 'top'})
+    
+    for sheet_name, df, column_widths in sheets:
+        worksheet = workbook.add_worksheet(sheet_name)
+        for col, width in enumerate(column_widths or []):
+            worksheet.set_column(col, col, width)
+        
+        worksheet.write_row(0, 0, list(df.columns), header_format)
+        # Missing values become blank cells, as they were with to_excel
+        rows = df.astype(object).where(df.notna(), None).values.tolist()
+        for row_idx, row in enumerate(rows, start=1):
+            worksheet.write_row(row_idx, 0, row)
+    
+    workbook.close()
+    output.seek(0)
+    return output
+
+
 # ==================== ROUTES ====================
 
 @router.get("/timesheet")
@@ -135,97 +276,66 @@ async def get_timesheet(
     # Determine which user's timesheet to fetch
     target_user_id = user_id if user_id and current_user.role == UserRole.PARTNER else current_user.id
     
-    # Parse reference date
-    if date:
-        try:
-            ref_date = datetime.strptime(date, "%Y-%m-%d").replace(tzinfo=timezone.utc)
-        except ValueError:
-            raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
-    else:
-        ref_date = datetime.now(timezone.utc)
-    
-    # Calculate date range based on period
-    if period == "daily":
-        start_date = ref_date.replace(hour=0, minute=0, second=0, microsecond=0)
-        end_date = start_date + timedelta(days=1)
-        period_label = ref_date.strftime("%d %b %Y")
-    elif period == "weekly":
-        # Start from Monday
-        days_since_monday = ref_date.weekday()
-        start_date = (ref_date - timedelta(days=days_since_monday)).replace(hour=0, minute=0, second=0, microsecond=0)
-        end_date = start_date + timedelta(days=7)
-        period_label = f"{start_date.strftime('%d %b')} - {(end_date - timedelta(days=1)).strftime('%d %b %Y')}"
-    elif period == "monthly":
-        start_date = ref_date.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        if ref_date.month == 12:
-            end_date = start_date.replace(year=ref_date.year + 1, month=1)
-        else:
-            end_date = start_date.replace(month=ref_date.month + 1)
-        period_label = ref_date.strftime("%B %Y")
-    else:
+    # Resolve the period's date range
+    try:
+        spec = resolve_period(period, date or today_str())
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
+    except KeyError:
         raise HTTPException(status_code=400, detail="Invalid period. Use daily, weekly, or monthly")
+    start_date, end_date, period_label = spec.start, spec.end, spec.label
+    
+    cache_key = ("user", current_user.tenant_id, target_user_id, period, start_date)
+    cached = _timesheet_cache.get(cache_key)
+    if cached is not None:
+        return cached
     
     # Get completed tasks in the date range for the user (filtered by tenant_id)
     task_query = {
         "assignee_id": target_user_id,
         "status": TaskStatus.COMPLETED,
-        "completed_at": {
-            "$gte": start_date.isoformat(),
-            "$lt": end_date.isoformat()
-        }
+        **completed_between(start_date, end_date)
     }
     if current_user.tenant_id:
         task_query["tenant_id"] = current_user.tenant_id
     
-    completed_tasks = await db.tasks.find(task_query).sort("completed_at", 1).to_list(length=500)
+    completed_tasks = await db.tasks.find(
+        task_query, TIMESHEET_TASK_PROJECTION
+    ).sort("completed_at", 1).to_list(length=500)
     
     # Get user info (filtered by tenant_id)
-    user_query = {"id": target_user_id}
-    if current_user.tenant_id:
-        user_query["tenant_id"] = current_user.tenant_id
-    user = await db.users.find_one(user_query)
-    user_name = user["name"] if user else "Unknown"
-    
-    # Build timesheet entries
-    entries = []
-    total_hours = 0
-    
-    for task in completed_tasks:
-        actual_hours = task.get("actual_hours", 0) or 0
-        total_hours += actual_hours
-        
-        completed_at = task.get("completed_at")
-        completed_dt = parse_datetime(completed_at)
-        if completed_dt:
-            completed_ist = completed_dt + timedelta(hours=5, minutes=30)
-            completed_date = completed_ist.strftime("%Y-%m-%d")
-            completed_time = completed_ist.strftime("%I:%M %p")
-        else:
-            completed_date = "N/A"
-            completed_time = "N/A"
-        
-        entries.append({
-            "task_id": task["id"],
-            "title": task["title"],
-            "client_name": task.get("client_name", ""),
-            "category": task.get("category", ""),
-            "completed_date": completed_date,
-            "completed_time": completed_time,
-            "estimated_hours": task.get("estimated_hours"),
-            "actual_hours": actual_hours,
-            "description": task.get("description", "")
-        })
+    user_name = await get_user_name(target_user_id, current_user.tenant_id)
+    
+    # Build timesheet entries column-wise in pandas
+    tasks_df = pd.DataFrame(completed_tasks, columns=[
+        "id", "title", "client_name", "category", "description",
+        "estimated_hours", "actual_hours", "completed_at"
+    ])
+    actual_hours = tasks_df["actual_hours"].fillna(0)
+    total_hours = float(actual_hours.sum())
+    completed_ist = to_ist(tasks_df["completed_at"])
+    completed_date = completed_ist.dt.strftime("%Y-%m-%d").fillna("N/A")
+    
+    entries_df = pd.DataFrame({
+        "task_id": tasks_df["id"],
+        "title": tasks_df["title"],
+        "client_name": tasks_df["client_name"].fillna(""),
+        "category": tasks_df["category"].fillna(""),
+        "completed_date": completed_date,
+        "completed_time": completed_ist.dt.strftime("%I:%M %p").fillna("N/A"),
+        "estimated_hours": tasks_df["estimated_hours"],
+        "actual_hours": actual_hours,
+        "description": tasks_df["description"].fillna("")
+    })
+    # Missing values go out as null - NaN isn't valid JSON
+    entries = entries_df.astype(object).where(entries_df.notna(), None).to_dict(orient="records")
     
     # Group by date for summary
-    daily_summary = {}
-    for entry in entries:
-        date_key = entry["completed_date"]
-        if date_key not in daily_summary:
-            daily_summary[date_key] = {"tasks": 0, "hours": 0}
-        daily_summary[date_key]["tasks"] += 1
-        daily_summary[date_key]["hours"] += entry["actual_hours"]
-    
-    return {
+    daily_summary = actual_hours.groupby(completed_date, sort=False).agg(
+        tasks="size", hours="sum"
+    ).to_dict(orient="index")
+    
+    timesheet = {
         "user_id": target_user_id,
         "user_name": user_name,
         "period": period,
@@ -237,6 +347,8 @@ async def get_timesheet(
         "daily_summary": daily_summary,
         "entries": entries
     }
+    _timesheet_cache[cache_key] = timesheet
+    return timesheet
 
 
 @router.get("/timesheet/team")
@@ -246,62 +358,53 @@ async def get_team_timesheet(
     current_user=Depends(get_current_partner)
 ):
     """Get timesheet summary for all team members (Partners only)"""
-    # Parse reference date
-    if date:
-        try:
-            ref_date = datetime.strptime(date, "%Y-%m-%d").replace(tzinfo=timezone.utc)
-        except ValueError:
-            raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
-    else:
-        ref_date = datetime.now(timezone.utc)
-    
-    # Calculate date range
-    if period == "daily":
-        start_date = ref_date.replace(hour=0, minute=0, second=0, microsecond=0)
-        end_date = start_date + timedelta(days=1)
-        period_label = ref_date.strftime("%d %b %Y")
-    elif period == "weekly":
-        days_since_monday = ref_date.weekday()
-        start_date = (ref_date - timedelta(days=days_since_monday)).replace(hour=0, minute=0, second=0, microsecond=0)
-        end_date = start_date + timedelta(days=7)
-        period_label = f"{start_date.strftime('%d %b')} - {(end_date - timedelta(days=1)).strftime('%d %b %Y')}"
-    elif period == "monthly":
-        start_date = ref_date.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        if ref_date.month == 12:
-            end_date = start_date.replace(year=ref_date.year + 1, month=1)
-        else:
-            end_date = start_date.replace(month=ref_date.month + 1)
-        period_label = ref_date.strftime("%B %Y")
-    else:
+    # Resolve the period's date range
+    try:
+        spec = resolve_period(period, date or today_str())
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
+    except KeyError:
         raise HTTPException(status_code=400, detail="Invalid period")
+    start_date, end_date, period_label = spec.start, spec.end, spec.label
+    
+    cache_key = ("team", current_user.tenant_id, period, start_date)
+    cached = _timesheet_cache.get(cache_key)
+    if cached is not None:
+        return cached
     
     # Get all active users for this tenant
     user_query = {"active": True}
     if current_user.tenant_id:
         user_query["tenant_id"] = current_user.tenant_id
-    users = await db.users.find(user_query).to_list(length=100)
+    users = await db.users.find(user_query, TEAM_USER_PROJECTION).to_list(length=100)
+    
+    # Completed-task totals for the whole team in one aggregation (filtered by tenant_id)
+    task_match = {
+        "assignee_id": {"$in": [user["id"] for user in users]},
+        "status": TaskStatus.COMPLETED,
+        **completed_between(start_date, end_date)
+    }
+    if current_user.tenant_id:
+        task_match["tenant_id"] = current_user.tenant_id
+    
+    pipeline = [
+        {"$match": task_match},
+        {"$group": {
+            "_id": "$assignee_id",
+            "total_hours": {"$sum": {"$ifNull": ["$actual_hours", 0]}},
+            "task_count": {"$sum": 1}
+        }}
+    ]
+    totals_by_user = {row["_id"]: row async for row in db.tasks.aggregate(pipeline)}
     
     team_summary = []
     grand_total_hours = 0
     grand_total_tasks = 0
     
     for user in users:
-        # Get completed tasks for this user (filtered by tenant_id)
-        task_query = {
-            "assignee_id": user["id"],
-            "status": TaskStatus.COMPLETED,
-            "completed_at": {
-                "$gte": start_date.isoformat(),
-                "$lt": end_date.isoformat()
-            }
-        }
-        if current_user.tenant_id:
-            task_query["tenant_id"] = current_user.tenant_id
-        
-        completed_tasks = await db.tasks.find(task_query).to_list(length=500)
-        
-        total_hours = sum(t.get("actual_hours", 0) or 0 for t in completed_tasks)
-        task_count = len(completed_tasks)
+        totals = totals_by_user.get(user["id"], {})
+        total_hours = totals.get("total_hours", 0)
+        task_count = totals.get("task_count", 0)
         
         grand_total_hours += total_hours
         grand_total_tasks += task_count
@@ -319,7 +422,7 @@ async def get_team_timesheet(
     # Sort by total hours descending
     team_summary.sort(key=lambda x: x["total_hours"], reverse=True)
     
-    return {
+    team_timesheet = {
         "period": period,
         "period_label": period_label,
         "start_date": start_date.strftime("%Y-%m-%d"),
@@ -328,6 +431,8 @@ async def get_team_timesheet(
         "grand_total_hours": round(grand_total_hours, 2),
         "team_summary": team_summary
     }
+    _timesheet_cache[cache_key] = team_timesheet
+    return team_timesheet
 
 
 @router.get("/timesheet/export")
@@ -341,82 +446,50 @@ async def export_timesheet(
     # Get timesheet data
     target_user_id = user_id if user_id and current_user.role == UserRole.PARTNER else current_user.id
     
-    # Parse reference date
-    if date:
-        try:
-            ref_date = datetime.strptime(date, "%Y-%m-%d").replace(tzinfo=timezone.utc)
-        except ValueError:
-            raise HTTPException(status_code=400, detail="Invalid date format")
-    else:
-        ref_date = datetime.now(timezone.utc)
-    
-    # Calculate date range
-    if period == "daily":
-        start_date = ref_date.replace(hour=0, minute=0, second=0, microsecond=0)
-        end_date = start_date + timedelta(days=1)
-        period_label = ref_date.strftime("%d_%b_%Y")
-    elif period == "weekly":
-        days_since_monday = ref_date.weekday()
-        start_date = (ref_date - timedelta(days=days_since_monday)).replace(hour=0, minute=0, second=0, microsecond=0)
-        end_date = start_date + timedelta(days=7)
-        period_label = f"{start_date.strftime('%d%b')}_to_{(end_date - timedelta(days=1)).strftime('%d%b_%Y')}"
-    else:  # monthly
-        start_date = ref_date.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        if ref_date.month == 12:
-            end_date = start_date.replace(year=ref_date.year + 1, month=1)
-        else:
-            end_date = start_date.replace(month=ref_date.month + 1)
-        period_label = ref_date.strftime("%B_%Y")
+    # Resolve the period's date range
+    try:
+        spec = resolve_period(period, date or today_str())
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format")
+    except KeyError:
+        raise HTTPException(status_code=400, detail="Invalid period")
+    start_date, end_date, period_label = spec.start, spec.end, spec.file_label
     
     # Get user info (filter by tenant for security)
-    user_query = {"id": target_user_id}
-    if current_user.tenant_id:
-        user_query["tenant_id"] = current_user.tenant_id
-    user = await db.users.find_one(user_query)
-    user_name = user["name"] if user else "Unknown"
+    user_name = await get_user_name(target_user_id, current_user.tenant_id)
     
     # Get completed tasks (filter by tenant)
     task_query = {
         "assignee_id": target_user_id,
         "status": TaskStatus.COMPLETED,
-        "completed_at": {
-            "$gte": start_date.isoformat(),
-            "$lt": end_date.isoformat()
-        }
+        **completed_between(start_date, end_date)
     }
     if current_user.tenant_id:
         task_query["tenant_id"] = current_user.tenant_id
     
-    completed_tasks = await db.tasks.find(task_query).sort("completed_at", 1).to_list(length=500)
-    
-    # Build data for Excel
-    timesheet_data = []
-    total_hours = 0
-    
-    for task in completed_tasks:
-        actual_hours = task.get("actual_hours", 0) or 0
-        total_hours += actual_hours
-        
-        completed_at = task.get("completed_at")
-        completed_dt = parse_datetime(completed_at)
-        if completed_dt:
-            completed_ist = completed_dt + timedelta(hours=5, minutes=30)
-            completed_date = completed_ist.strftime("%d-%b-%Y")
-            day_name = completed_ist.strftime("%A")
-        else:
-            completed_date = "N/A"
-            day_name = ""
-        
-        timesheet_data.append({
-            "Date": completed_date,
-            "Day": day_name,
-            "Task": task["title"],
-            "Client": task.get("client_name", ""),
-            "Category": task.get("category", ""),
-            "Description": task.get("description", "")[:100] if task.get("description") else "",
-            "Est. Hours": task.get("estimated_hours", ""),
-            "Actual Hours": actual_hours
-        })
+    completed_tasks = await db.tasks.find(
+        task_query, TIMESHEET_TASK_PROJECTION
+    ).sort("completed_at", 1).to_list(length=500)
+    
+    # Build data for Excel - shaped column-wise in pandas rather than row by row
+    tasks_df = pd.DataFrame(completed_tasks, columns=[
+        "title", "client_name", "category", "description",
+        "estimated_hours", "actual_hours", "completed_at"
+    ])
+    actual_hours = tasks_df["actual_hours"].fillna(0)
+    total_hours = float(actual_hours.sum())
+    completed_ist = to_ist(tasks_df["completed_at"])
+    
+    df_timesheet = pd.DataFrame({
+        "Date": completed_ist.dt.strftime("%d-%b-%Y").fillna("N/A"),
+        "Day": completed_ist.dt.day_name().fillna(""),
+        "Task": tasks_df["title"],
+        "Client": tasks_df["client_name"].fillna(""),
+        "Category": tasks_df["category"].fillna(""),
+        "Description": tasks_df["description"].fillna("").str.slice(0, 100),
+        "Est. Hours": tasks_df["estimated_hours"].fillna(""),
+        "Actual Hours": actual_hours
+    })
     
     # Create summary data
     summary_data = [
@@ -429,24 +502,10 @@ async def export_timesheet(
     ]
     
     # Create Excel file
-    output = io.BytesIO()
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        # Summary sheet
-        df_summary = pd.DataFrame(summary_data)
-        df_summary.to_excel(writer, sheet_name='Summary', index=False)
-        
-        # Timesheet details
-        if timesheet_data:
-            df_timesheet = pd.DataFrame(timesheet_data)
-            df_timesheet.to_excel(writer, sheet_name='Timesheet', index=False)
-            
-            # Adjust column widths
-            worksheet = writer.sheets['Timesheet']
-            column_widths = {'A': 12, 'B': 12, 'C': 30, 'D': 20, 'E': 15, 'F': 40, 'G': 12, 'H': 12}
-            for col, width in column_widths.items():
-                worksheet.column_dimensions[col].width = width
-    
-    output.seek(0)
+    sheets = [("Summary", pd.DataFrame(summary_data), None)]
+    if not df_timesheet.empty:
+        sheets.append(("Timesheet", df_timesheet, [12, 12, 30, 20, 15, 40, 12, 12]))
+    output = await asyncio.to_thread(_build_timesheet_xlsx, sheets)
     
     safe_name = user_name.replace(" ", "_")
     filename = f"Timesheet_{safe_name}_{period_label}.xlsx"
@@ -465,118 +524,90 @@ async def export_team_timesheet(
     current_user=Depends(get_current_partner)
 ):
     """Export team timesheet as Excel file (Partners only)"""
-    # Parse reference date
-    if date:
-        try:
-            ref_date = datetime.strptime(date, "%Y-%m-%d").replace(tzinfo=timezone.utc)
-        except ValueError:
-            raise HTTPException(status_code=400, detail="Invalid date format")
-    else:
-        ref_date = datetime.now(timezone.utc)
-    
-    # Calculate date range
-    if period == "daily":
-        start_date = ref_date.replace(hour=0, minute=0, second=0, microsecond=0)
-        end_date = start_date + timedelta(days=1)
-        period_label = ref_date.strftime("%d_%b_%Y")
-    elif period == "weekly":
-        days_since_monday = ref_date.weekday()
-        start_date = (ref_date - timedelta(days=days_since_monday)).replace(hour=0, minute=0, second=0, microsecond=0)
-        end_date = start_date + timedelta(days=7)
-        period_label = f"{start_date.strftime('%d%b')}_to_{(end_date - timedelta(days=1)).strftime('%d%b_%Y')}"
-    else:
-        start_date = ref_date.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        if ref_date.month == 12:
-            end_date = start_date.replace(year=ref_date.year + 1, month=1)
-        else:
-            end_date = start_date.replace(month=ref_date.month + 1)
-        period_label = ref_date.strftime("%B_%Y")
+    # Resolve the period's date range
+    try:
+        spec = resolve_period(period, date or today_str())
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format")
+    except KeyError:
+        raise HTTPException(status_code=400, detail="Invalid period")
+    start_date, end_date, period_label = spec.start, spec.end, spec.file_label
     
     # Get all users (filter by tenant)
     user_query = {"active": True}
     if current_user.tenant_id:
         user_query["tenant_id"] = current_user.tenant_id
-    users = await db.users.find(user_query).to_list(length=100)
+    users = await db.users.find(user_query, TEAM_USER_PROJECTION).to_list(length=100)
     
-    # Build team summary
-    team_data = []
-    all_tasks_data = []
-    grand_total_hours = 0
+    # Fetch the whole team's completed tasks in one query (filter by tenant)
+    task_query = {
+        "assignee_id": {"$in": [user["id"] for user in users]},
+        "status": TaskStatus.COMPLETED,
+        **completed_between(start_date, end_date)
+    }
+    if current_user.tenant_id:
+        task_query["tenant_id"] = current_user.tenant_id
     
+    team_tasks = await db.tasks.find(
+        task_query, TIMESHEET_TASK_PROJECTION
+    ).sort("completed_at", 1).to_list(length=None)
+    tasks_df = pd.DataFrame(team_tasks, columns=[
+        "assignee_id", "title", "description", "client_name", "category",
+        "estimated_hours", "actual_hours", "completed_at"
+    ])
+    actual_hours = tasks_df["actual_hours"].fillna(0)
+    
+    # Build team summary - per-user totals in one groupby
+    hours_by_user = actual_hours.groupby(tasks_df["assignee_id"]).sum().to_dict()
+    count_by_user = tasks_df["assignee_id"].value_counts().to_dict()
+    team_data = []
     for user in users:
-        # Filter tasks by tenant
-        task_query = {
-            "assignee_id": user["id"],
-            "status": TaskStatus.COMPLETED,
-            "completed_at": {
-                "$gte": start_date.isoformat(),
-                "$lt": end_date.isoformat()
-            }
-        }
-        if current_user.tenant_id:
-            task_query["tenant_id"] = current_user.tenant_id
-        
-        completed_tasks = await db.tasks.find(task_query).sort("completed_at", 1).to_list(length=500)
-        
-        total_hours = sum(t.get("actual_hours", 0) or 0 for t in completed_tasks)
-        grand_total_hours += total_hours
-        
+        total_hours = float(hours_by_user.get(user["id"], 0))
+        task_count = int(count_by_user.get(user["id"], 0))
         team_data.append({
             "Employee": user["name"],
             "Department": user.get("department", ""),
             "Role": user["role"].capitalize(),
-            "Tasks Completed": len(completed_tasks),
+            "Tasks Completed": task_count,
             "Total Hours": round(total_hours, 2),
-            "Avg Hours/Task": round(total_hours / len(completed_tasks), 2) if completed_tasks else 0
+            "Avg Hours/Task": round(total_hours / task_count, 2) if task_count else 0
         })
-        
-        # Add individual task entries
-        for task in completed_tasks:
-            completed_at = task.get("completed_at")
-            completed_dt = parse_datetime(completed_at)
-            if completed_dt:
-                completed_ist = completed_dt + timedelta(hours=5, minutes=30)
-                completed_date = completed_ist.strftime("%d-%b-%Y")
-            else:
-                completed_date = "N/A"
-            
-            all_tasks_data.append({
-                "Employee": user["name"],
-                "Date": completed_date,
-                "Task": task["title"],
-                "Description": (task.get("description", "") or "")[:150],  # Truncate long descriptions
-                "Client": task.get("client_name", ""),
-                "Category": task.get("category", ""),
-                "Est. Hours": task.get("estimated_hours", ""),
-                "Actual Hours": task.get("actual_hours", 0)
-            })
+    grand_total_hours = float(actual_hours.sum())
+    
+    # Individual task entries, grouped by user in team order and by completion time within
+    user_order = {user["id"]: i for i, user in enumerate(users)}
+    user_names = {user["id"]: user["name"] for user in users}
+    order = tasks_df["assignee_id"].map(user_order).sort_values(kind="stable").index
+    tasks_df, actual_hours = tasks_df.loc[order], actual_hours.loc[order]
+    completed_ist = to_ist(tasks_df["completed_at"])
+    df_tasks = pd.DataFrame({
+        "Employee": tasks_df["assignee_id"].map(user_names),
+        "Date": completed_ist.dt.strftime("%d-%b-%Y").fillna("N/A"),
+        "Task": tasks_df["title"],
+        "Description": tasks_df["description"].fillna("").str.slice(0, 150),  # Truncate long descriptions
+        "Client": tasks_df["client_name"].fillna(""),
+        "Category": tasks_df["category"].fillna(""),
+        "Est. Hours": tasks_df["estimated_hours"].fillna(""),
+        "Actual Hours": actual_hours
+    })
     
     # Sort team by hours
     team_data.sort(key=lambda x: x["Total Hours"], reverse=True)
     
     # Create Excel
-    output = io.BytesIO()
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        # Summary
-        summary_data = [
-            {"Field": "Period", "Value": period.capitalize()},
-            {"Field": "Date Range", "Value": f"{start_date.strftime('%d %b %Y')} - {(end_date - timedelta(days=1)).strftime('%d %b %Y')}"},
-            {"Field": "Total Team Hours", "Value": round(grand_total_hours, 2)},
-            {"Field": "Total Tasks", "Value": len(all_tasks_data)}
-        ]
-        df_summary = pd.DataFrame(summary_data)
-        df_summary.to_excel(writer, sheet_name='Summary', index=False)
-        
-        # Team summary
-        df_team = pd.DataFrame(team_data)
-        df_team.to_excel(writer, sheet_name='Team Summary', index=False)
-        
-        # All tasks detail
-        if all_tasks_data:
-            df_tasks = pd.DataFrame(all_tasks_data)
-            df_tasks.to_excel(writer, sheet_name='All Tasks', index=False)
-    
-    output.seek(0)
+    summary_data = [
+        {"Field": "Period", "Value": period.capitalize()},
+        {"Field": "Date Range", "Value": f"{start_date.strftime('%d %b %Y')} - {(end_date - timedelta(days=1)).strftime('%d %b %Y')}"},
+        {"Field": "Total Team Hours", "Value": round(grand_total_hours, 2)},
+        {"Field": "Total Tasks", "Value": len(df_tasks)}
+    ]
+    sheets = [
+        ("Summary", pd.DataFrame(summary_data), None),
+        ("Team Summary", pd.DataFrame(team_data), None)
+    ]
+    if not df_tasks.empty:
+        sheets.append(("All Tasks", df_tasks, None))
+    output = await asyncio.to_thread(_build_timesheet_xlsx, sheets)
     
     filename = f"Team_Timesheet_{period_label}.xlsx"
     
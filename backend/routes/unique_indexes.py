@@ -0,0 +1,27 @@
+"""
+Unique index registry for TaskAct
+Records which unique indexes exist so writes know whether they can rely on them
+"""
+from pymongo.errors import OperationFailure
+
+# Unique indexes confirmed at startup, as (collection, fields). While one is missing
+# (e.g. legacy duplicates block it), writes relying on it keep an explicit lookup.
+_unique_indexes = set()
+
+
+async def ensure_unique_index(collection, fields, logger):
+    """Create a unique index on `fields` and record it; a failure is logged, not raised"""
+    try:
+        await collection.create_index([(field, 1) for field in fields], unique=True)
+    except OperationFailure as e:
+        logger.error(
+            f"Unique index on {collection.name} {fields} not created, "
+            f"keeping explicit duplicate checks: {str(e)}"
+        )
+        return
+    _unique_indexes.add((collection.name, tuple(fields)))
+
+
+def has_unique_index(collection_name, *fields):
+    """Whether the unique index on these fields was created at startup"""
+    return (collection_name, fields) in _unique_indexes
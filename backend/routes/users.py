@@ -5,14 +5,20 @@ Handles user CRUD, activation/deactivation, password management
 from fastapi import APIRouter, HTTPException, Depends, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from datetime import datetime, timezone
+import asyncio
 import uuid
 import jwt
-from passlib.context import CryptContext
+from .auth_cache import get_cached_caller, cache_caller, clear_auth_cache
+from .passwords import pwd_context
+from .unique_indexes import ensure_unique_index, has_unique_index
+from pymongo.errors import DuplicateKeyError
 
 router = APIRouter(tags=["Users"])
 
 security = HTTPBearer()
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+# Every stored user field except the password hash, for UserResponse payloads
+USER_PROJECTION = {"_id": 0, "password_hash": 0}
 
 # These will be set by server.py when including the router
 db = None
@@ -26,18 +32,19 @@ PasswordResetRequest = None
 parse_from_mongo = None
 prepare_for_mongo = None
 create_notification = None
+invalidate_reference_cache = None
 logger = None
 
 
 def init_users_routes(
     _db, _secret_key, _algorithm,
     _user_role, _user_response, _user_create, _user_profile_update, _password_reset_request,
-    _parse_mongo, _prepare_mongo, _create_notification, _logger
+    _parse_mongo, _prepare_mongo, _create_notification, _invalidate_reference_cache, _logger
 ):
     """Initialize users routes with dependencies from main app"""
     global db, SECRET_KEY, ALGORITHM
     global UserRole, UserResponse, UserCreate, UserProfileUpdate, PasswordResetRequest
-    global parse_from_mongo, prepare_for_mongo, create_notification, logger
+    global parse_from_mongo, prepare_for_mongo, create_notification, invalidate_reference_cache, logger
     
     db = _db
     SECRET_KEY = _secret_key
@@ -50,9 +57,17 @@ def init_users_routes(
     parse_from_mongo = _parse_mongo
     prepare_for_mongo = _prepare_mongo
     create_notification = _create_notification
+    invalidate_reference_cache = _invalidate_reference_cache
     logger = _logger
 
 
+async def ensure_users_indexes():
+    """Create the index behind per-tenant email uniqueness (idempotent, run at startup)"""
+    # id, (id, active) and (tenant_id, active) user lookups are indexed by the
+    # tenants, projects and tasks modules
+    await ensure_unique_index(db.users, ["email", "tenant_id"], logger)
+
+
 # ==================== HELPER FUNCTIONS ====================
 
 def get_password_hash(password):
@@ -65,6 +80,11 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+    
+    cached_user = get_cached_caller("users", credentials.credentials)
+    if cached_user is not None:
+        return cached_user
+    
     try:
         payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=[ALGORITHM])
         user_id: str = payload.get("sub")
@@ -73,11 +93,14 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
     except jwt.PyJWTError:
         raise credentials_exception
     
-    user = await db.users.find_one({"id": user_id, "active": True})
+    user = await db.users.find_one({"id": user_id, "active": True}, USER_PROJECTION)
     if user is None:
         raise credentials_exception
     
-    return UserResponse(**parse_from_mongo(user))
+    # Only successful verifications reach the cache
+    user_response = UserResponse(**parse_from_mongo(user))
+    cache_caller("users", credentials.credentials, user_response, payload.get("exp"))
+    return user_response
 
 
 async def get_current_partner(current_user=Depends(get_current_user)):
@@ -89,10 +112,9 @@ async def get_current_partner(current_user=Depends(get_current_user)):
     return current_user
 
 
-async def get_tenant_id(current_user):
-    """Helper to get tenant_id from current user"""
-    user_doc = await db.users.find_one({"id": current_user.id})
-    return user_doc.get("tenant_id") if user_doc else None
+def get_tenant_id(current_user):
+    """Helper to get tenant_id from current user (already loaded by get_current_user)"""
+    return current_user.tenant_id
 
 
 # ==================== ROUTES ====================
@@ -101,21 +123,13 @@ async def get_tenant_id(current_user):
 async def create_user(user_data: dict, current_user=Depends(get_current_partner)):
     """Create a new user (Partners only) - within same tenant"""
     # Get tenant_id from current user
-    tenant_id = await get_tenant_id(current_user)
+    tenant_id = get_tenant_id(current_user)
     
     if not tenant_id:
         raise HTTPException(status_code=400, detail="Tenant not found")
     
     # Hash the password
-    password_hash = get_password_hash(user_data.get("password"))
-    
-    # Check if email already exists within the same tenant
-    existing_user = await db.users.find_one({
-        "email": user_data.get("email"),
-        "tenant_id": tenant_id
-    })
-    if existing_user:
-        raise HTTPException(status_code=400, detail="Email already registered in this organization")
+    password_hash = await asyncio.to_thread(get_password_hash, user_data.get("password"))
     
     user_dict = user_data.copy()
     user_dict.pop("password", None)  # Remove plain password
@@ -125,8 +139,22 @@ async def create_user(user_data: dict, current_user=Depends(get_current_partner)
     user_dict["active"] = True
     user_dict["tenant_id"] = tenant_id  # Add tenant_id
     
+    # The unique (email, tenant_id) index rejects an email already used in this
+    # tenant on insert; look up only while it is missing
+    if not has_unique_index("users", "email", "tenant_id"):
+        existing_user = await db.users.find_one({
+            "email": user_data.get("email"),
+            "tenant_id": tenant_id
+        }, {"_id": 1})
+        if existing_user:
+            raise HTTPException(status_code=400, detail="Email already registered in this organization")
+    
     user_dict = prepare_for_mongo(user_dict)
-    await db.users.insert_one(user_dict)
+    try:
+        await db.users.insert_one(user_dict)
+    except DuplicateKeyError:
+        raise HTTPException(status_code=400, detail="Email already registered in this organization")
+    invalidate_reference_cache()
     
     return UserResponse(**parse_from_mongo(user_dict))
 
@@ -138,21 +166,21 @@ async def get_users(
 ):
     """Get all users within the same tenant. Partners can include inactive users."""
     # Get tenant_id from current user
-    tenant_id = await get_tenant_id(current_user)
+    tenant_id = get_tenant_id(current_user)
     
     query = {"tenant_id": tenant_id} if tenant_id else {}
     
     if not (include_inactive and current_user.role == UserRole.PARTNER):
         query["active"] = True
     
-    users = await db.users.find(query).to_list(length=5000)
+    users = await db.users.find(query, USER_PROJECTION).to_list(length=5000)
     return [UserResponse(**parse_from_mongo(user)) for user in users]
 
 
 @router.get("/users/{user_id}")
 async def get_user(user_id: str, current_user=Depends(get_current_user)):
     """Get a specific user by ID"""
-    user = await db.users.find_one({"id": user_id, "active": True})
+    user = await db.users.find_one({"id": user_id, "active": True}, USER_PROJECTION)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     return UserResponse(**parse_from_mongo(user))
@@ -166,7 +194,9 @@ async def update_user_profile(
 ):
     """Update user profile (Partners only)"""
     # Get existing user
-    existing_user = await db.users.find_one({"id": user_id, "active": True})
+    existing_user = await db.users.find_one(
+        {"id": user_id, "active": True}, {"_id": 0, "email": 1, "tenant_id": 1}
+    )
     if not existing_user:
         raise HTTPException(status_code=404, detail="User not found")
     
@@ -176,27 +206,36 @@ async def update_user_profile(
     if not update_data:
         raise HTTPException(status_code=400, detail="No update data provided")
     
-    # Check if email is being changed and if it already exists within the same tenant
-    if "email" in update_data and update_data["email"] != existing_user["email"]:
+    # Without the unique (email, tenant_id) index, check an email change explicitly
+    email_changed = "email" in update_data and update_data["email"] != existing_user.get("email")
+    if email_changed and not has_unique_index("users", "email", "tenant_id"):
         tenant_id = existing_user.get("tenant_id")
         email_query = {"email": update_data["email"]}
         if tenant_id:
             email_query["tenant_id"] = tenant_id
-        existing_email = await db.users.find_one(email_query)
+        existing_email = await db.users.find_one(email_query, {"_id": 1})
         if existing_email:
             raise HTTPException(status_code=400, detail="Email already exists in this organization")
     
     # Convert datetime fields to ISO strings
     update_data = prepare_for_mongo(update_data)
     
-    # Update the user
-    result = await db.users.update_one({"id": user_id}, {"$set": update_data})
+    # Update the user; the unique (email, tenant_id) index rejects an email already
+    # used by someone else in the same tenant
+    try:
+        result = await db.users.update_one({"id": user_id}, {"$set": update_data})
+    except DuplicateKeyError:
+        if "email" not in update_data:
+            raise
+        raise HTTPException(status_code=400, detail="Email already exists in this organization")
+    invalidate_reference_cache()
+    clear_auth_cache()  # role and profile changes apply from the next request
     
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="User not found")
     
     # Get updated user
-    updated_user = await db.users.find_one({"id": user_id})
+    updated_user = await db.users.find_one({"id": user_id}, USER_PROJECTION)
     
     # Create notification for user about profile update
     if user_id != current_user.id:
@@ -218,12 +257,12 @@ async def reset_user_password(
 ):
     """Reset a user's password (Partners only)"""
     # Verify the user exists
-    user = await db.users.find_one({"id": user_id, "active": True})
+    user = await db.users.find_one({"id": user_id, "active": True}, {"_id": 1})
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
     # Hash the new password
-    new_password_hash = get_password_hash(password_data.get("new_password"))
+    new_password_hash = await asyncio.to_thread(get_password_hash, password_data.get("new_password"))
     
     # Update the password
     result = await db.users.update_one(
@@ -257,7 +296,7 @@ async def delete_user(
         raise HTTPException(status_code=400, detail="Cannot delete your own account")
     
     # Check if user exists
-    user = await db.users.find_one({"id": user_id})
+    user = await db.users.find_one({"id": user_id}, {"_id": 0, "id": 1, "name": 1, "active": 1})
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
@@ -271,6 +310,8 @@ async def delete_user(
     
     # Delete the user permanently
     result = await db.users.delete_one({"id": user_id})
+    invalidate_reference_cache()
+    clear_auth_cache()
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="User not found")
     
@@ -291,7 +332,7 @@ async def deactivate_user(
         raise HTTPException(status_code=400, detail="Cannot deactivate your own account")
     
     # Check if user exists
-    user = await db.users.find_one({"id": user_id})
+    user = await db.users.find_one({"id": user_id}, {"_id": 0, "id": 1, "name": 1, "active": 1})
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
@@ -304,6 +345,8 @@ async def deactivate_user(
         {"id": user_id},
         {"$set": {"active": False}}
     )
+    invalidate_reference_cache()
+    clear_auth_cache()  # the deactivated user loses access on their next request
     
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="User not found")
@@ -318,7 +361,7 @@ async def reactivate_user(
 ):
     """Reactivate a deactivated user"""
     # Check if user exists
-    user = await db.users.find_one({"id": user_id})
+    user = await db.users.find_one({"id": user_id}, {"_id": 0, "id": 1, "name": 1, "active": 1})
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
@@ -331,6 +374,7 @@ async def reactivate_user(
         {"id": user_id},
         {"$set": {"active": True}}
     )
+    invalidate_reference_cache()
     
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="User not found")
@@ -19,19 +19,19 @@ import uuid
 from datetime import datetime, timezone, timedelta
 from enum import Enum
 import jwt
-from passlib.context import CryptContext
 import pandas as pd
 import io
 import resend
 
 # Import route modules
+from routes.passwords import pwd_context
 from routes.auth import router as auth_router, init_auth_routes
-from routes.users import router as users_router, init_users_routes
-from routes.tasks import router as tasks_router, init_tasks_routes
+from routes.users import router as users_router, init_users_routes, ensure_users_indexes
+from routes.tasks import router as tasks_router, init_tasks_routes, ensure_tasks_indexes, invalidate_reference_cache
 from routes.attendance import router as attendance_router, init_attendance_routes
-from routes.timesheets import router as timesheets_router, init_timesheets_routes
-from routes.tenants import router as tenants_router, init_tenants_routes
-from routes.projects import router as projects_router, init_projects_routes
+from routes.timesheets import router as timesheets_router, init_timesheets_routes, ensure_timesheets_indexes, invalidate_timesheet_cache
+from routes.tenants import router as tenants_router, init_tenants_routes, ensure_tenants_indexes
+from routes.projects import router as projects_router, init_projects_routes, ensure_projects_indexes
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
@@ -59,7 +59,6 @@ if RESEND_API_KEY:
     resend.api_key = RESEND_API_KEY
 
 security = HTTPBearer()
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 # Configure logging early
 logging.basicConfig(
@@ -500,8 +499,11 @@ def check_within_any_geofence(lat: float, lon: float, locations: list, radius: f
     
     return (is_within, round(closest_distance, 2) if closest_distance != float('inf') else None, closest_location)
 
+# Keys whose string values parse_from_mongo converts back to datetimes
+DATETIME_KEY_SUFFIXES = ('_at', 'due_date', 'timestamp')
+
 def prepare_for_mongo(data):
-    """Convert datetime objects to ISO strings for MongoDB storage"""
+    """Convert datetime objects to ISO strings for MongoDB storage (in place)"""
     if isinstance(data, dict):
         for key, value in data.items():
             if isinstance(value, datetime):
@@ -509,14 +511,13 @@ def prepare_for_mongo(data):
     return data
 
 def parse_from_mongo(item):
-    """Parse MongoDB document for API response - handles ObjectId and datetime"""
+    """Parse MongoDB document for API response - handles ObjectId and datetime (in place)"""
     if isinstance(item, dict):
         # Remove MongoDB's _id field (ObjectId is not JSON serializable)
-        if '_id' in item:
-            del item['_id']
+        item.pop('_id', None)
         # Parse datetime strings
         for key, value in item.items():
-            if isinstance(value, str) and key.endswith(('_at', 'due_date', 'timestamp')):
+            if isinstance(value, str) and key.endswith(DATETIME_KEY_SUFFIXES):
                 try:
                     item[key] = datetime.fromisoformat(value)
                 except ValueError:
@@ -554,7 +555,7 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
     except jwt.PyJWTError:
         raise credentials_exception
     
-    user = await db.users.find_one({"id": user_id, "active": True})
+    user = await db.users.find_one({"id": user_id, "active": True}, {"_id": 0, "password_hash": 0})
     if user is None:
         raise credentials_exception
     return UserResponse(**parse_from_mongo(user))
@@ -579,6 +580,15 @@ async def create_notification(user_id: str, title: str, message: str, task_id: s
     await db.notifications.insert_one(notification_dict)
     return notification
 
+async def create_notifications_bulk(entries: List[dict]):
+    """Create many notifications in one insert - each entry takes create_notification's arguments"""
+    notifications = [Notification(**entry) for entry in entries]
+    if notifications:
+        await db.notifications.insert_many(
+            [prepare_for_mongo(n.dict()) for n in notifications], ordered=False
+        )
+    return notifications
+
 def generate_otp(length: int = 6) -> str:
     """Generate a random numeric OTP"""
     return ''.join(random.choices(string.digits, k=length))
@@ -647,16 +657,22 @@ async def update_overdue_tasks(tenant_id: str = None):
     """Automatically update tasks to overdue status if past due date"""
     current_time = datetime.now(timezone.utc)
     
-    # Build query - filter by tenant if provided
+    # Build query - filter by tenant if provided. Mongo pre-filters to tasks due
+    # before tomorrow in either stored form (ISO strings sort chronologically,
+    # datetimes compare natively); the exact timezone-aware check below decides
+    horizon = current_time + timedelta(days=1)
     query = {
         "status": TaskStatus.PENDING,
-        "due_date": {"$ne": None}
+        "$or": [
+            {"due_date": {"$lt": horizon.isoformat()}},
+            {"due_date": {"$lt": horizon}}
+        ]
     }
     if tenant_id:
         query["tenant_id"] = tenant_id
     
     # Only check PENDING tasks for overdue - ON_HOLD tasks should stay on hold
-    tasks = await db.tasks.find(query).to_list(length=5000)
+    tasks = await db.tasks.find(query, {"_id": 0, "id": 1, "due_date": 1}).to_list(length=5000)
     
     # Collect bulk operations for overdue tasks
     bulk_operations = []
@@ -700,6 +716,17 @@ async def update_overdue_tasks(tenant_id: str = None):
     
     return updated_count
 
+OVERDUE_SWEEP_INTERVAL_SECONDS = 60
+
+async def overdue_sweep_loop():
+    """Mark past-due tasks overdue in the background, rather than on every task listing"""
+    while True:
+        try:
+            await update_overdue_tasks()
+        except Exception as e:
+            logger.error(f"Overdue sweep failed: {str(e)}")
+        await asyncio.sleep(OVERDUE_SWEEP_INTERVAL_SECONDS)
+
 # ==================== INITIALIZE ROUTE MODULES ====================
 # Initialize auth routes with dependencies
 init_auth_routes(
@@ -728,6 +755,7 @@ init_users_routes(
     _parse_mongo=parse_from_mongo,
     _prepare_mongo=prepare_for_mongo,
     _create_notification=create_notification,
+    _invalidate_reference_cache=invalidate_reference_cache,
     _logger=logger
 )
 
@@ -747,9 +775,11 @@ init_tasks_routes(
     _parse_mongo=parse_from_mongo,
     _prepare_mongo=prepare_for_mongo,
     _create_notification=create_notification,
+    _create_notifications_bulk=create_notifications_bulk,
     _update_overdue_tasks=update_overdue_tasks,
     _get_ist_now=get_ist_now,
     _format_ist_datetime=format_ist_datetime,
+    _invalidate_timesheet_cache=invalidate_timesheet_cache,
     _logger=logger
 )
 
@@ -808,6 +838,7 @@ init_projects_routes(
     _task_status=TaskStatus,
     _parse_mongo=parse_from_mongo,
     _prepare_mongo=prepare_for_mongo,
+    _invalidate_timesheet_cache=invalidate_timesheet_cache,
     _logger=logger
 )
 
@@ -862,6 +893,7 @@ async def create_category(category_data: CategoryCreate, current_user: UserRespo
     category_dict = prepare_for_mongo(category.dict())
     category_dict["tenant_id"] = current_user.tenant_id  # Ensure tenant_id is in the stored document
     await db.categories.insert_one(category_dict)
+    invalidate_reference_cache()
     return category
 
 # Category Template and Bulk Import endpoints (Partners only) - Must come before parameterized routes
@@ -979,6 +1011,7 @@ async def update_category(
             raise HTTPException(status_code=400, detail="Category name already exists")
     
     result = await db.categories.update_one({"id": category_id}, {"$set": update_data})
+    invalidate_reference_cache()
     
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Category not found")
@@ -997,6 +1030,7 @@ async def delete_category(category_id: str, current_user: UserResponse = Depends
         raise HTTPException(status_code=400, detail="Cannot delete category that is in use by tasks")
     
     result = await db.categories.update_one({"id": category_id}, {"$set": {"active": False}})
+    invalidate_reference_cache()
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Category not found")
     return {"message": "Category deleted successfully"}
@@ -1080,6 +1114,9 @@ async def bulk_import_categories(
                 error_count += 1
                 errors.append(f"Row {index + 2}: {str(e)}")
         
+        if success_count:
+            invalidate_reference_cache()
+        
         return BulkImportResult(
             success_count=success_count,
             error_count=error_count,
@@ -1109,6 +1146,7 @@ async def create_client(client_data: ClientCreate, current_user: UserResponse =
     client_dict = prepare_for_mongo(client.dict())
     client_dict["tenant_id"] = current_user.tenant_id  # Ensure tenant_id is in the stored document
     await db.clients.insert_one(client_dict)
+    invalidate_reference_cache()
     return client
 
 # Client Template and Bulk Import endpoints (Partners only) - Must come before parameterized routes
@@ -1239,7 +1277,7 @@ async def get_clients(current_user: UserResponse = Depends(get_current_user)):
     
     # For non-partners, filter by visible_clients if set
     if current_user.role != UserRole.PARTNER:
-        user_doc = await db.users.find_one({"id": current_user.id})
+        user_doc = await db.users.find_one({"id": current_user.id}, {"_id": 0, "visible_clients": 1})
         visible_client_ids = user_doc.get("visible_clients") if user_doc else None
         if visible_client_ids is not None:
             all_clients = [c for c in all_clients if c.id in visible_client_ids]
@@ -1284,6 +1322,7 @@ async def update_client(
             raise HTTPException(status_code=400, detail="Client name already exists")
     
     result = await db.clients.update_one({"id": client_id}, {"$set": update_data})
+    invalidate_reference_cache()
     
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Client not found")
@@ -1299,6 +1338,7 @@ async def delete_client(client_id: str, current_user: UserResponse = Depends(get
         raise HTTPException(status_code=400, detail="Cannot delete client that is in use by tasks")
     
     result = await db.clients.update_one({"id": client_id}, {"$set": {"active": False}})
+    invalidate_reference_cache()
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Client not found")
     return {"message": "Client deleted successfully"}
@@ -1396,6 +1436,9 @@ async def bulk_import_clients(
                 error_count += 1
                 errors.append(f"Row {index + 2}: {str(e)}")
         
+        if success_count:
+            invalidate_reference_cache()
+        
         return BulkImportResult(
             success_count=success_count,
             error_count=error_count,
@@ -1412,7 +1455,7 @@ async def get_filters(current_user: UserResponse = Depends(get_current_user)):
     if current_user.role == UserRole.PARTNER:
         pass  # See all
     elif current_user.role == UserRole.ASSOCIATE_DIRECTOR:
-        user_doc = await db.users.find_one({"id": current_user.id})
+        user_doc = await db.users.find_one({"id": current_user.id}, {"_id": 0, "managed_members": 1})
         managed_ids = user_doc.get("managed_members", []) if user_doc else []
         query["assignee_id"] = {"$in": [current_user.id] + managed_ids}
     else:
@@ -1439,7 +1482,7 @@ async def get_dashboard(current_user: UserResponse = Depends(get_current_user)):
     if current_user.role == UserRole.PARTNER:
         pass  # See all tasks in tenant
     elif current_user.role == UserRole.ASSOCIATE_DIRECTOR:
-        user_doc = await db.users.find_one({"id": current_user.id})
+        user_doc = await db.users.find_one({"id": current_user.id}, {"_id": 0, "managed_members": 1})
         managed_ids = user_doc.get("managed_members", []) if user_doc else []
         task_query["assignee_id"] = {"$in": [current_user.id] + managed_ids}
     else:
@@ -1448,11 +1491,18 @@ async def get_dashboard(current_user: UserResponse = Depends(get_current_user)):
     # Update overdue tasks before getting counts (only for this tenant)
     await update_overdue_tasks(current_user.tenant_id)
     
-    # Get counts by status
-    pending_count = await db.tasks.count_documents({**task_query, "status": TaskStatus.PENDING})
-    on_hold_count = await db.tasks.count_documents({**task_query, "status": TaskStatus.ON_HOLD})
-    completed_count = await db.tasks.count_documents({**task_query, "status": TaskStatus.COMPLETED})
-    overdue_count = await db.tasks.count_documents({**task_query, "status": TaskStatus.OVERDUE})
+    # Get counts by status in one aggregation
+    status_counts = {}
+    status_pipeline = [
+        {"$match": task_query},
+        {"$group": {"_id": "$status", "count": {"$sum": 1}}}
+    ]
+    async for row in db.tasks.aggregate(status_pipeline):
+        status_counts[row["_id"]] = row["count"]
+    pending_count = status_counts.get(TaskStatus.PENDING.value, 0)
+    on_hold_count = status_counts.get(TaskStatus.ON_HOLD.value, 0)
+    completed_count = status_counts.get(TaskStatus.COMPLETED.value, 0)
+    overdue_count = status_counts.get(TaskStatus.OVERDUE.value, 0)
     
     # Get overdue tasks (all for partners, own for others)
     overdue_tasks = await db.tasks.find({**task_query, "status": TaskStatus.OVERDUE}).sort("due_date", 1).to_list(length=5000)
@@ -1474,11 +1524,28 @@ async def get_dashboard(current_user: UserResponse = Depends(get_current_user)):
     # Get team performance (only for partners) - filter by tenant_id
     team_stats = []
     if current_user.role == UserRole.PARTNER:
-        users = await db.users.find({**tenant_filter, "active": True}).to_list(length=5000)
+        users = await db.users.find(
+            {**tenant_filter, "active": True}, {"_id": 0, "id": 1, "name": 1, "role": 1}
+        ).to_list(length=5000)
+        
+        # Get task counts for the whole team in one aggregation
+        counts_by_user = {}
+        if users:
+            team_pipeline = [
+                {"$match": {**tenant_filter, "assignee_id": {"$in": [user["id"] for user in users]}}},
+                {"$group": {
+                    "_id": "$assignee_id",
+                    "total": {"$sum": 1},
+                    "completed": {"$sum": {"$cond": [{"$eq": ["$status", TaskStatus.COMPLETED.value]}, 1, 0]}}
+                }}
+            ]
+            async for row in db.tasks.aggregate(team_pipeline):
+                counts_by_user[row["_id"]] = row
         
         for user in users:
-            user_tasks = await db.tasks.count_documents({**tenant_filter, "assignee_id": user["id"]})
-            completed_tasks = await db.tasks.count_documents({**tenant_filter, "assignee_id": user["id"], "status": TaskStatus.COMPLETED})
+            counts = counts_by_user.get(user["id"], {})
+            user_tasks = counts.get("total", 0)
+            completed_tasks = counts.get("completed", 0)
             
             team_stats.append({
                 "user_id": user["id"],
@@ -1577,6 +1644,24 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.on_event("startup")
+async def create_db_indexes():
+    """Create indexes for hot query paths - create_index is a no-op if they already exist"""
+    for ensure_indexes in (
+        ensure_projects_indexes, ensure_tasks_indexes, ensure_users_indexes,
+        ensure_tenants_indexes, ensure_timesheets_indexes
+    ):
+        try:
+            await ensure_indexes()
+        except Exception as e:
+            # Don't block startup (e.g. duplicate legacy ids on a unique index)
+            logger.error(f"Index creation failed in {ensure_indexes.__name__}: {str(e)}")
+
+@app.on_event("startup")
+async def start_overdue_sweep():
+    app.state.overdue_sweep = asyncio.create_task(overdue_sweep_loop())
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    app.state.overdue_sweep.cancel()
     client.close()
\ No newline at end of file
@@ -456,6 +456,66 @@ class TestProjectEnhancements:
         
         print(f"✓ Status transitions correctly: pending → completed → pending")
 
+    # ==================== FEATURE 3: PROJECT TASK PAGINATION ====================
+
+    def test_09_project_tasks_pagination(self):
+        """Test paging through project tasks with limit/after keeps template order"""
+        due_date = (datetime.now() + timedelta(days=30)).strftime("%Y-%m-%d")
+
+        project_payload = {
+            "name": f"TEST_TaskPagination_{uuid.uuid4().hex[:8]}",
+            "description": "Test project task pagination",
+            "due_date": due_date,
+            "tasks": [
+                {"title": f"Paged Task {i}", "assignee_id": USER_SONU, "priority": "medium"}
+                for i in range(5)
+            ]
+        }
+
+        create_response = self.session.post(f"{BASE_URL}/api/projects", json=project_payload)
+        assert create_response.status_code in [200, 201]
+
+        project_id = create_response.json()["id"]
+        self.created_project_ids.append(project_id)
+
+        # Without limit the endpoint still returns the plain list
+        all_response = self.session.get(f"{BASE_URL}/api/projects/{project_id}/tasks")
+        assert all_response.status_code == 200
+        all_titles = [t["title"] for t in all_response.json()]
+        assert all_titles == [f"Paged Task {i}" for i in range(5)]
+
+        # Page through two at a time
+        paged_titles = []
+        params = {"limit": 2}
+        while True:
+            page_response = self.session.get(f"{BASE_URL}/api/projects/{project_id}/tasks", params=params)
+            assert page_response.status_code == 200
+            page = page_response.json()
+            assert len(page["items"]) <= 2
+            paged_titles.extend(t["title"] for t in page["items"])
+            if not page["next"]:
+                break
+            params = {"limit": 2, "after": page["next"]}
+
+        assert paged_titles == all_titles, f"Paged order {paged_titles} != {all_titles}"
+
+        # A cursor from a legacy task without created_at (which sorts first) continues
+        # into the dated tasks instead of comparing against a "None" string
+        legacy_response = self.session.get(
+            f"{BASE_URL}/api/projects/{project_id}/tasks",
+            params={"limit": 10, "after": f"|{'0' * 24}"}
+        )
+        assert legacy_response.status_code == 200
+        assert [t["title"] for t in legacy_response.json()["items"]] == all_titles
+
+        # Out-of-range limit and malformed cursor are rejected
+        assert self.session.get(f"{BASE_URL}/api/projects/{project_id}/tasks", params={"limit": 0}).status_code == 400
+        assert self.session.get(
+            f"{BASE_URL}/api/projects/{project_id}/tasks", params={"limit": 2, "after": "bad-cursor"}
+        ).status_code == 400
+
+        print(f"✓ Paged through {len(paged_titles)} tasks in order")
+
 
 if __name__ == "__main__":
     pytest.main([__file__, "-v", "--tb=short"])